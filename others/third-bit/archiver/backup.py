@@ -8,35 +8,57 @@ import time
 
 
 HASH_LEN = 16
+CHUNK_SIZE = 64 * 1024
 
-def hash_all(root):
+def hash_all(root, stats=None):
     result = []
+    buffer = memoryview(bytearray(CHUNK_SIZE))
+    total = 0
+    start = time.perf_counter()
     for name in glob("**/*.*", root_dir=root, recursive=True):
         full_name = Path(root, name)
-        with open(full_name, 'rb') as reader:
-            data = reader.read()
-            hash_code = sha256(data).hexdigest()[:HASH_LEN]
-            result.append((name, hash_code))
+        hash_code, size = hash_file(full_name, buffer)
+        result.append((name, hash_code))
+        total += size
+    if stats is not None:
+        stats["files"] = len(result)
+        stats["bytes"] = total
+        stats["seconds"] = time.perf_counter() - start
     return result
 
 
-def backup(source_dir, backup_dir):
-    manifest = hash_all(source_dir)
+def hash_file(path, buffer):
+    """Hash a file a chunk at a time, reusing buffer for every read"""
+    hasher = sha256()
+    size = 0
+    with open(path, 'rb') as reader:
+        while count := reader.readinto(buffer):
+            hasher.update(buffer[:count])
+            size += count
+    return hasher.hexdigest()[:HASH_LEN], size
+
+
+def throughput(stats):
+    return stats["bytes"] / max(stats["seconds"], 1e-9)
+
+
+def backup(source_dir, backup_dir, stats=None):
+    manifest = hash_all(source_dir, stats)
     timestamp = current_time()
     write_manifest(backup_dir, timestamp, manifest)
     copy_files(source_dir, backup_dir, manifest)
     return manifest
 
 
-def write_manifest(backup_dir, timestamp, manifest):
+def write_manifest(backup_dir, timestamp, manifest, header=("filename", "hash")):
     backup_dir = Path(backup_dir)
     if not backup_dir.exists():
         backup_dir.mkdir()
     manifest_file = Path(backup_dir, f"{timestamp}.csv")
     with open(manifest_file,'w') as raw:
         writer = csv.writer(raw)
-        writer.writerow(["filename", "hash"])
-        writer.writerows(manifest)
+        writer.writerow(header)
+        writer.writerows(sorted(manifest))
 
 def copy_files(source_dir, backup_dir, manifest):
     for (filename, hash_code) in manifest:
@@ -56,4 +78,9 @@ if __name__ == "__main__":
         sys.exit(1)
 
     source_dir, backup_dir = sys.argv[1:]
-    backup(source_dir, backup_dir)
+    stats = {}
+    backup(source_dir, backup_dir, stats)
+    print(
+        f"hashed {stats['files']} files, {stats['bytes']} bytes"
+        f" in {stats['seconds']:.3f}s ({throughput(stats) / 1e6:.1f} MB/s)"
+    )
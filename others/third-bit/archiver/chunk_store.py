@@ -0,0 +1,120 @@
+"""Deduplicated backup: split files into content-defined chunks and store
+each distinct chunk once. Boundaries are picked by a rolling (gear) hash
+of the content, so an insertion only changes the chunks around it."""
+
+from glob import glob
+from hashlib import sha256
+import os
+from pathlib import Path
+import random
+import sys
+
+from backup import CHUNK_SIZE, HASH_LEN, current_time, write_manifest
+
+MIN_CHUNK = 2 * 1024
+MAX_CHUNK = 64 * 1024
+AVG_BITS = 13
+WINDOW = 64
+MASK = (1 << 64) - 1
+# test the high bits: the low bits only depend on the last few bytes
+BOUNDARY = ((1 << AVG_BITS) - 1) << (64 - AVG_BITS)
+_rng = random.Random(0)
+GEAR = [_rng.getrandbits(64) for _ in range(256)]
+
+CHUNK_DIR = "chunks"
+HEADER = ("filename", "hash", "chunks")
+
+
+def find_cut(data):
+    """Length of the first chunk in data"""
+    end = min(len(data), MAX_CHUNK)
+    if end <= MIN_CHUNK:
+        return end
+    h = 0
+    # the gear hash only remembers the last WINDOW bytes
+    for i in range(MIN_CHUNK - WINDOW, end):
+        h = ((h << 1) + GEAR[data[i]]) & MASK
+        if (i >= MIN_CHUNK) and not (h & BOUNDARY):
+            return i + 1
+    return end
+
+
+def split_chunks(path, buffer):
+    pending = bytearray()
+    eof = False
+    with open(path, "rb") as reader:
+        while pending or not eof:
+            while not eof and len(pending) < MAX_CHUNK:
+                count = reader.readinto(buffer)
+                eof = (count == 0)
+                pending += buffer[:count]
+            if not pending:
+                break
+            cut = find_cut(pending)
+            yield bytes(pending[:cut])
+            del pending[:cut]
+
+
+def store_file(path, chunk_dir, known, buffer, stats):
+    file_hash = sha256()
+    chunk_hashes = []
+    for chunk in split_chunks(path, buffer):
+        file_hash.update(chunk)
+        chunk_hash = sha256(chunk).hexdigest()[:HASH_LEN]
+        chunk_hashes.append(chunk_hash)
+        stats["chunks"] += 1
+        stats["bytes"] += len(chunk)
+        if chunk_hash not in known:
+            # write then rename, so a crash never leaves a short chunk
+            # under a name later runs would take as stored
+            chunk_file = Path(chunk_dir, f"{chunk_hash}.chk")
+            temp_file = Path(chunk_dir, f"{chunk_hash}.chk.tmp")
+            with open(temp_file, "wb") as writer:
+                writer.write(chunk)
+            os.replace(temp_file, chunk_file)
+            known.add(chunk_hash)
+            stats["new_chunks"] += 1
+            stats["stored_bytes"] += len(chunk)
+    return file_hash.hexdigest()[:HASH_LEN], chunk_hashes
+
+
+def backup(source_dir, backup_dir, stats=None):
+    chunk_dir = Path(backup_dir, CHUNK_DIR)
+    chunk_dir.mkdir(parents=True, exist_ok=True)
+    known = {
+        name[:-len(".chk")] for name in os.listdir(chunk_dir) if name.endswith(".chk")
+    }
+    buffer = memoryview(bytearray(CHUNK_SIZE))
+    stats = {} if stats is None else stats
+    stats.update(files=0, bytes=0, chunks=0, new_chunks=0, stored_bytes=0)
+
+    manifest = []
+    for name in glob("**/*.*", root_dir=source_dir, recursive=True):
+        path = Path(source_dir, name)
+        file_hash, chunk_hashes = store_file(path, chunk_dir, known, buffer, stats)
+        manifest.append((name, file_hash, " ".join(chunk_hashes)))
+        stats["files"] += 1
+    stats["dedup_ratio"] = stats["bytes"] / max(stats["stored_bytes"], 1)
+    write_manifest(backup_dir, current_time(), manifest, HEADER)
+    return manifest
+
+
+def read_chunks(backup_dir, chunk_hashes):
+    for chunk_hash in chunk_hashes.split():
+        with open(Path(backup_dir, CHUNK_DIR, f"{chunk_hash}.chk"), "rb") as reader:
+            yield reader.read()
+
+
+if __name__ == "__main__":
+    if not len(sys.argv) == 3:
+        print("Usage: chunk_store.py <source_dir> <backup_dir>")
+        sys.exit(1)
+
+    source_dir, backup_dir = sys.argv[1:]
+    stats = {}
+    backup(source_dir, backup_dir, stats)
+    print(
+        f"{stats['files']} files, {stats['bytes']} bytes in {stats['chunks']}"
+        f" chunks; stored {stats['new_chunks']} new chunks"
+        f" ({stats['stored_bytes']} bytes), dedup ratio {stats['dedup_ratio']:.2f}"
+    )
@@ -0,0 +1,215 @@
+"""Backup into pack files: many objects appended to one .pack file, with
+a .idx file recording where each hash lives and how it was compressed.
+Restores map the pack into memory instead of opening one file per hash."""
+
+import csv
+from glob import glob
+from hashlib import sha256
+import lzma
+import mmap
+import os
+from pathlib import Path
+import struct
+import sys
+from uuid import uuid4
+import zlib
+
+from backup import CHUNK_SIZE, HASH_LEN, current_time, hash_file, write_manifest
+
+CODECS = {"none": 0, "zlib": 1, "lzma": 2}
+# hash, offset, stored length, codec
+INDEX_ENTRY = struct.Struct(f"<{HASH_LEN}sQQB")
+
+
+def _compressor(codec):
+    if codec == CODECS["zlib"]:
+        return zlib.compressobj()
+    if codec == CODECS["lzma"]:
+        return lzma.LZMACompressor()
+    return None
+
+
+def _decompressor(codec):
+    if codec == CODECS["zlib"]:
+        return zlib.decompressobj()
+    if codec == CODECS["lzma"]:
+        return lzma.LZMADecompressor()
+    return None
+
+
+class PackWriter:
+    def __init__(self, backup_dir, name, known, compression="zlib"):
+        self._pack_path = Path(backup_dir, f"{name}.pack")
+        self._index_path = Path(backup_dir, f"{name}.idx")
+        self._temp_path = Path(backup_dir, f"{name}.pack.tmp")
+        self._writer = open(self._temp_path, "wb")
+        self._codec = CODECS[compression]
+        self._known = known
+        self._entries = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._writer.close()
+            self._temp_path.unlink()
+
+    def add_file(self, path, buffer):
+        """Hash a file first and only read and compress it again if the
+        hash is new; the stored hash is taken from the bytes actually
+        written, in case the file changed in between"""
+        hash_code, size = hash_file(path, buffer)
+        if hash_code in self._known:
+            return hash_code, size, 0
+
+        start = self._writer.tell()
+        hasher = sha256()
+        compressor = _compressor(self._codec)
+        size = 0
+        with open(path, "rb") as reader:
+            while count := reader.readinto(buffer):
+                hasher.update(buffer[:count])
+                size += count
+                self._write(compressor, buffer[:count])
+        if compressor is not None:
+            self._writer.write(compressor.flush())
+
+        hash_code = hasher.hexdigest()[:HASH_LEN]
+        if hash_code in self._known:
+            self._writer.seek(start)
+            self._writer.truncate()
+            return hash_code, size, 0
+        stored = self._writer.tell() - start
+        self._known.add(hash_code)
+        self._entries.append((hash_code.encode("ascii"), start, stored, self._codec))
+        return hash_code, size, stored
+
+    def _write(self, compressor, data):
+        self._writer.write(data if compressor is None else compressor.compress(data))
+
+    def close(self):
+        self._writer.close()
+        if not self._entries:
+            self._temp_path.unlink()
+            return
+        os.replace(self._temp_path, self._pack_path)
+        # the index appears last, so readers never see a partial pack
+        temp_index = Path(f"{self._index_path}.tmp")
+        with open(temp_index, "wb") as writer:
+            for entry in self._entries:
+                writer.write(INDEX_ENTRY.pack(*entry))
+        os.replace(temp_index, self._index_path)
+
+
+class PackReader:
+    def __init__(self, backup_dir):
+        self._index = {}
+        self._maps = []
+        for index_path in sorted(Path(backup_dir).glob("*.idx")):
+            pack_path = index_path.with_suffix(".pack")
+            # a pack of empty files stored uncompressed has no bytes, and
+            # mmap refuses empty files; its entries all have length 0
+            if pack_path.stat().st_size == 0:
+                self._maps.append(None)
+            else:
+                with open(pack_path, "rb") as reader:
+                    self._maps.append(mmap.mmap(reader.fileno(), 0, access=mmap.ACCESS_READ))
+            pack = len(self._maps) - 1
+            with open(index_path, "rb") as reader:
+                raw = reader.read()
+            for hash_code, offset, length, codec in INDEX_ENTRY.iter_unpack(raw):
+                self._index[hash_code.decode("ascii")] = (pack, offset, length, codec)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __contains__(self, hash_code):
+        return hash_code in self._index
+
+    def hashes(self):
+        return set(self._index.keys())
+
+    def write_to(self, hash_code, writer):
+        pack, offset, length, codec = self._index[hash_code]
+        if length == 0:
+            return
+        decompressor = _decompressor(codec)
+        with memoryview(self._maps[pack]) as view:
+            for start in range(offset, offset + length, CHUNK_SIZE):
+                piece = view[start:min(start + CHUNK_SIZE, offset + length)]
+                if decompressor is None:
+                    writer.write(piece)
+                else:
+                    writer.write(decompressor.decompress(piece))
+                piece.release()
+
+    def read(self, hash_code):
+        pieces = _Collect()
+        self.write_to(hash_code, pieces)
+        return b"".join(pieces)
+
+    def close(self):
+        for mapped in self._maps:
+            if mapped is not None:
+                mapped.close()
+        self._maps = []
+
+
+class _Collect(list):
+    def write(self, data):
+        self.append(bytes(data))
+
+
+def backup(source_dir, backup_dir, compression="zlib", stats=None):
+    Path(backup_dir).mkdir(parents=True, exist_ok=True)
+    with PackReader(backup_dir) as existing:
+        known = existing.hashes()
+    timestamp = current_time()
+    buffer = memoryview(bytearray(CHUNK_SIZE))
+    manifest, total, stored = [], 0, 0
+    # timestamps repeat within a second, and a pack replaced by a later run
+    # would take objects that earlier manifests still point at with it
+    pack_name = f"pack-{timestamp}-{uuid4().hex[:12]}"
+    with PackWriter(backup_dir, pack_name, known, compression) as writer:
+        for name in glob("**/*.*", root_dir=source_dir, recursive=True):
+            hash_code, size, written = writer.add_file(Path(source_dir, name), buffer)
+            manifest.append((name, hash_code))
+            total += size
+            stored += written
+    write_manifest(backup_dir, timestamp, manifest)
+    if stats is not None:
+        stats["files"] = len(manifest)
+        stats["bytes"] = total
+        stats["stored_bytes"] = stored
+    return manifest
+
+
+def restore(backup_dir, timestamp, target_dir):
+    with open(Path(backup_dir, f"{timestamp}.csv"), "r", newline="") as raw:
+        rows = list(csv.reader(raw))[1:]
+    with PackReader(backup_dir) as reader:
+        for name, hash_code in rows:
+            target = Path(target_dir, name)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with open(target, "wb") as writer:
+                reader.write_to(hash_code, writer)
+
+
+if __name__ == "__main__":
+    if not len(sys.argv) == 3:
+        print("Usage: packs.py <source_dir> <backup_dir>")
+        sys.exit(1)
+
+    source_dir, backup_dir = sys.argv[1:]
+    stats = {}
+    backup(source_dir, backup_dir, stats=stats)
+    print(
+        f"{stats['files']} files, {stats['bytes']} bytes,"
+        f" {stats['stored_bytes']} bytes added to packs"
+    )
@@ -0,0 +1,118 @@
+"""Backup with discovery, hashing and copying running concurrently.
+Stages are connected by bounded queues so a slow stage applies back
+pressure instead of letting work pile up in memory."""
+
+from glob import glob
+from pathlib import Path
+from queue import Queue
+import shutil
+import sys
+import threading
+import time
+
+from backup import CHUNK_SIZE, current_time, hash_file, throughput, write_manifest
+
+HASHERS = 4
+COPIERS = 2
+QUEUE_SIZE = 64
+DONE = object()
+
+
+def backup(source_dir, backup_dir, hashers=HASHERS, copiers=COPIERS,
+           queue_size=QUEUE_SIZE, stats=None):
+    Path(backup_dir).mkdir(parents=True, exist_ok=True)
+    names, to_copy = Queue(queue_size), Queue(queue_size)
+    manifest, errors = [], []
+    claimed, lock = set(), threading.Lock()
+    counts = {"bytes": 0, "copied": 0}
+
+    def discover():
+        try:
+            for name in glob("**/*.*", root_dir=source_dir, recursive=True):
+                names.put(name)
+        finally:
+            for _ in range(hashers):
+                names.put(DONE)
+
+    def hasher():
+        buffer = memoryview(bytearray(CHUNK_SIZE))
+
+        def work(name):
+            hash_code, size = hash_file(Path(source_dir, name), buffer)
+            with lock:
+                manifest.append((name, hash_code))
+                counts["bytes"] += size
+            to_copy.put((name, hash_code))
+
+        _drain(names, work, errors)
+
+    def copier():
+        def work(item):
+            name, hash_code = item
+            with lock:
+                if hash_code in claimed:
+                    return
+                claimed.add(hash_code)
+            backup_path = Path(backup_dir, f"{hash_code}.bck")
+            if not backup_path.exists():
+                shutil.copy(Path(source_dir, name), backup_path)
+                with lock:
+                    counts["copied"] += 1
+
+        _drain(to_copy, work, errors)
+
+    start = time.perf_counter()
+    discovery = _start(discover, 1)
+    hashing = _start(hasher, hashers)
+    copying = _start(copier, copiers)
+    for thread in discovery + hashing:
+        thread.join()
+    for _ in range(copiers):
+        to_copy.put(DONE)
+    for thread in copying:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+    manifest.sort()
+    write_manifest(backup_dir, current_time(), manifest)
+    if stats is not None:
+        stats["files"] = len(manifest)
+        stats["bytes"] = counts["bytes"]
+        stats["copied"] = counts["copied"]
+        stats["seconds"] = time.perf_counter() - start
+    return manifest
+
+
+def _start(target, count):
+    threads = [threading.Thread(target=target, daemon=True) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def _drain(inbox, work, errors):
+    """Run work on each item until DONE; after a failure keep consuming
+    (without working) so upstream stages never block on a full queue"""
+    while (item := inbox.get()) is not DONE:
+        if errors:
+            continue
+        try:
+            work(item)
+        except Exception as exc:
+            errors.append(exc)
+
+
+if __name__ == "__main__":
+    if not len(sys.argv) == 3:
+        print("Usage: pipeline.py <source_dir> <backup_dir>")
+        sys.exit(1)
+
+    source_dir, backup_dir = sys.argv[1:]
+    stats = {}
+    backup(source_dir, backup_dir, stats=stats)
+    print(
+        f"hashed {stats['files']} files, {stats['bytes']} bytes,"
+        f" copied {stats['copied']} in {stats['seconds']:.3f}s"
+        f" ({throughput(stats) / 1e6:.1f} MB/s)"
+    )
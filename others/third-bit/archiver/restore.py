@@ -0,0 +1,119 @@
+"""Restore a tree from a {timestamp}.csv manifest of .bck files, and diff
+two manifests by streaming them side by side."""
+
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import os
+from pathlib import Path
+import shutil
+import sys
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+WORKERS = 8
+# Linux ioctl that makes a file share another's blocks (btrfs, XFS)
+FICLONE = 0x40049409
+
+
+def read_manifest(manifest_file):
+    with open(manifest_file, "r", newline="") as raw:
+        reader = csv.reader(raw)
+        next(reader)
+        for row in reader:
+            yield row[0], row[1]
+
+
+def restore(backup_dir, timestamp, target_dir, workers=WORKERS, link=False):
+    """Rebuild target_dir. With link=True files are hard-linked to the
+    backup copies, so they must be treated as read-only."""
+    rows = read_manifest(Path(backup_dir, f"{timestamp}.csv"))
+
+    def restore_one(row):
+        name, hash_code = row
+        target = Path(target_dir, name)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        return place(Path(backup_dir, f"{hash_code}.bck"), target, link)
+
+    stats = {"link": 0, "clone": 0, "kernel_copy": 0, "copy": 0}
+    with ThreadPoolExecutor(workers) as pool:
+        for method in pool.map(restore_one, rows):
+            stats[method] += 1
+    return stats
+
+
+def place(source, target, link):
+    if link:
+        try:
+            os.link(source, target)
+            return "link"
+        except OSError:
+            pass
+    try:
+        return copy_in_kernel(source, target)
+    except (AttributeError, OSError):
+        shutil.copyfile(source, target)
+        return "copy"
+
+
+def copy_in_kernel(source, target):
+    """Reflink target to source where the filesystem allows it, so both
+    share blocks until one is modified ("clone"); otherwise copy with
+    copy_file_range, which keeps the data out of user space but still
+    writes every block ("kernel_copy")"""
+    with open(source, "rb") as reader, open(target, "wb") as writer:
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(writer.fileno(), FICLONE, reader.fileno())
+                return "clone"
+            except OSError:
+                pass
+        remaining = os.fstat(reader.fileno()).st_size
+        while remaining > 0:
+            sent = os.copy_file_range(reader.fileno(), writer.fileno(), remaining)
+            if sent == 0:
+                break
+            remaining -= sent
+    return "kernel_copy"
+
+
+def diff(old_file, new_file):
+    """Yield (status, filename) for files added, changed or removed between
+    two manifests whose rows are sorted by filename"""
+    old_rows, new_rows = _sorted(read_manifest(old_file)), _sorted(read_manifest(new_file))
+    old, new = next(old_rows, None), next(new_rows, None)
+    while (old is not None) or (new is not None):
+        if (new is None) or ((old is not None) and (old[0] < new[0])):
+            yield "removed", old[0]
+            old = next(old_rows, None)
+        elif (old is None) or (new[0] < old[0]):
+            yield "added", new[0]
+            new = next(new_rows, None)
+        else:
+            if old[1] != new[1]:
+                yield "changed", new[0]
+            old, new = next(old_rows, None), next(new_rows, None)
+
+
+def _sorted(rows):
+    previous = None
+    for row in rows:
+        if (previous is not None) and (row[0] <= previous):
+            raise ValueError(f"Manifest not sorted at {row[0]}")
+        previous = row[0]
+        yield row
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == "restore":
+        stats = restore(*sys.argv[2:])
+        print(", ".join(f"{count} {method}" for method, count in stats.items()))
+    elif len(sys.argv) == 4 and sys.argv[1] == "diff":
+        for status, name in diff(*sys.argv[2:]):
+            print(status, name)
+    else:
+        print("Usage: restore.py restore <backup_dir> <timestamp> <target_dir>")
+        print("       restore.py diff <old.csv> <new.csv>")
+        sys.exit(1)
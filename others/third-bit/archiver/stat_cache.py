@@ -0,0 +1,98 @@
+"""Incremental backup: remember each file's stat signature and hash, and
+only rehash files whose size, mtime or inode changed since last time."""
+
+import csv
+from glob import glob
+import os
+from pathlib import Path
+import sys
+import time
+
+from backup import CHUNK_SIZE, copy_files, current_time, hash_file, write_manifest
+
+CACHE_FILE = "stat_cache.csv"
+# files modified this recently may change again within the same mtime
+# tick, so their signature can't be trusted on the next run
+RACY_NS = 2 * 10 ** 9
+
+
+def signature(path):
+    info = os.stat(path)
+    return (info.st_size, info.st_mtime_ns, info.st_ino)
+
+
+def load_cache(backup_dir):
+    cache_file = Path(backup_dir, CACHE_FILE)
+    if not cache_file.exists():
+        return {}
+    with open(cache_file, "r", newline="") as raw:
+        reader = csv.reader(raw)
+        next(reader)
+        return {
+            name: ((int(size), int(mtime_ns), int(inode)), hash_code)
+            for name, size, mtime_ns, inode, hash_code in reader
+        }
+
+
+def save_cache(backup_dir, cache):
+    cache_file = Path(backup_dir, CACHE_FILE)
+    temp_file = Path(backup_dir, f"{CACHE_FILE}.tmp")
+    with open(temp_file, "w", newline="") as raw:
+        writer = csv.writer(raw)
+        writer.writerow(["filename", "size", "mtime_ns", "inode", "hash"])
+        for name, (sig, hash_code) in sorted(cache.items()):
+            writer.writerow([name, *sig, hash_code])
+    os.replace(temp_file, cache_file)
+
+
+def hash_changed(root, cache, stats=None):
+    """Return the manifest and the cache to save for the next run"""
+    buffer = memoryview(bytearray(CHUNK_SIZE))
+    manifest, new_cache = [], {}
+    hashed = reused = total = 0
+    start = time.perf_counter()
+    for name in glob("**/*.*", root_dir=root, recursive=True):
+        full_name = Path(root, name)
+        sig = signature(full_name)
+        if (name in cache) and (cache[name][0] == sig):
+            hash_code = cache[name][1]
+            reused += 1
+        else:
+            hash_code, size = hash_file(full_name, buffer)
+            hashed += 1
+            total += size
+        manifest.append((name, hash_code))
+        if time.time_ns() - sig[1] > RACY_NS:
+            new_cache[name] = (sig, hash_code)
+    if stats is not None:
+        stats["files"] = len(manifest)
+        stats["hashed"] = hashed
+        stats["reused"] = reused
+        stats["bytes"] = total
+        stats["seconds"] = time.perf_counter() - start
+    return manifest, new_cache
+
+
+def backup(source_dir, backup_dir, stats=None):
+    cache = load_cache(backup_dir)
+    manifest, cache = hash_changed(source_dir, cache, stats)
+    timestamp = current_time()
+    write_manifest(backup_dir, timestamp, manifest)
+    copy_files(source_dir, backup_dir, manifest)
+    save_cache(backup_dir, cache)
+    return manifest
+
+
+if __name__ == "__main__":
+    if not len(sys.argv) == 3:
+        print("Usage: stat_cache.py <source_dir> <backup_dir>")
+        sys.exit(1)
+
+    source_dir, backup_dir = sys.argv[1:]
+    stats = {}
+    backup(source_dir, backup_dir, stats)
+    print(
+        f"{stats['files']} files: rehashed {stats['hashed']}"
+        f" ({stats['bytes']} bytes), reused {stats['reused']}"
+        f" in {stats['seconds']:.3f}s"
+    )
@@ -1,9 +1,18 @@
+import os
 from pathlib import Path
 from unittest.mock import patch
 import pytest
 import pyfakefs
 
-from backup import backup, hash_all, HASH_LEN
+from hashlib import sha256
+import random
+
+from backup import backup, hash_all, HASH_LEN, CHUNK_SIZE
+import pipeline
+import stat_cache
+import chunk_store
+import packs
+import restore
 
 FILES = {"a.txt": "aaa", "b.txt": "bbb", "sub_dir/c.txt": "ccc"}
 
@@ -12,6 +21,13 @@ def our_fs(fs):
     for name, contents in FILES.items():
         fs.create_file(name, contents=contents)
 
+@pytest.fixture
+def src_fs(fs):
+    """Files in their own directory, so /backup is not part of the source"""
+    for name, contents in FILES.items():
+        fs.create_file(Path("/src", name), contents=contents)
+    os.chdir("/src")
+
 def test_hashing(our_fs):
     result = hash_all(".")
     expected = {"a.txt", "b.txt", "sub_dir/c.txt"}
@@ -37,3 +53,189 @@ def test_nested_example(our_fs):
         assert Path("/backup", f"{hash_code}.bck").exists()
 
 
+def test_large_file_hashed_in_chunks(fs):
+    contents = bytes(range(256)) * (3 * CHUNK_SIZE // 256 + 7)
+    fs.create_file("big.bin", contents=contents)
+    stats = {}
+    result = hash_all(".", stats)
+    assert result == [("big.bin", sha256(contents).hexdigest()[:HASH_LEN])]
+    assert stats["files"] == 1
+    assert stats["bytes"] == len(contents)
+
+
+def test_pipelined_backup(src_fs):
+    timestamp = 1234
+    stats = {}
+    with patch("pipeline.current_time", return_value=timestamp):
+        manifest = pipeline.backup(".", "/backup", hashers=2, queue_size=1, stats=stats)
+    assert manifest == sorted(hash_all("."))
+    assert Path("/backup", f"{timestamp}.csv").exists()
+    for filename, hash_code in manifest:
+        assert Path("/backup", f"{hash_code}.bck").exists()
+    assert stats["copied"] == len(FILES)
+
+
+def test_stat_cache_skips_unchanged(src_fs):
+    for name in FILES:
+        os.utime(name, ns=(0, 0))
+    stats = {}
+    first = stat_cache.backup(".", "/backup", stats)
+    assert stats["hashed"] == len(FILES)
+    second = stat_cache.backup(".", "/backup", stats)
+    assert (stats["hashed"], stats["reused"]) == (0, len(FILES))
+    assert sorted(first) == sorted(second)
+
+    with open("a.txt", "w") as writer:
+        writer.write("this is new content for a.txt")
+    os.utime("a.txt", ns=(0, 10 ** 9))
+    changed = stat_cache.backup(".", "/backup", stats)
+    assert (stats["hashed"], stats["reused"]) == (1, len(FILES) - 1)
+    assert sorted(changed) == sorted(hash_all("."))
+
+
+def test_stat_cache_ignores_racy_files(src_fs):
+    stats = {}
+    stat_cache.backup(".", "/backup", stats)
+    stat_cache.backup(".", "/backup", stats)
+    assert stats["hashed"] == len(FILES)
+
+
+def test_chunk_store_dedups_shifted_content(fs):
+    data = random.Random(1).randbytes(100_000)
+    fs.create_file("/src/original.bin", contents=data)
+    fs.create_file("/src/shifted.bin", contents=data[:50_000] + b"X" + data[50_000:])
+    os.chdir("/src")
+    stats = {}
+    with patch("chunk_store.current_time", return_value=1234):
+        manifest = chunk_store.backup(".", "/backup", stats)
+    assert stats["bytes"] == 2 * len(data) + 1
+    assert stats["dedup_ratio"] > 1.5
+    for name, file_hash, chunk_hashes in manifest:
+        restored = b"".join(chunk_store.read_chunks("/backup", chunk_hashes))
+        assert restored == Path(name).read_bytes()
+
+    with patch("chunk_store.current_time", return_value=1235):
+        chunk_store.backup(".", "/backup", stats)
+    assert stats["new_chunks"] == 0
+
+
+def test_chunk_store_ignores_partial_writes(src_fs):
+    with patch("chunk_store.current_time", return_value=1234):
+        manifest = chunk_store.backup(".", "/backup")
+    chunk_dir = Path("/backup", chunk_store.CHUNK_DIR)
+    assert not list(chunk_dir.glob("*.tmp"))
+    # a crash mid-write leaves only a temp file behind
+    chunk_hash = manifest[0][2].split()[0]
+    (chunk_dir / f"{chunk_hash}.chk").rename(chunk_dir / f"{chunk_hash}.chk.tmp")
+    stats = {}
+    with patch("chunk_store.current_time", return_value=1235):
+        chunk_store.backup(".", "/backup", stats)
+    assert stats["new_chunks"] == 1
+    assert (chunk_dir / f"{chunk_hash}.chk").exists()
+
+
+# mmap needs real files, so the pack tests use tmp_path instead of fs
+@pytest.mark.parametrize("compression", ["none", "zlib", "lzma"])
+def test_pack_round_trip(tmp_path, monkeypatch, compression):
+    source, backup_dir, target = tmp_path / "src", tmp_path / "bck", tmp_path / "out"
+    for name, contents in {**FILES, "dup.txt": "aaa"}.items():
+        (source / name).parent.mkdir(parents=True, exist_ok=True)
+        (source / name).write_text(contents * 1000)
+    monkeypatch.setattr(packs, "current_time", lambda: 1234)
+    stats = {}
+    manifest = packs.backup(source, backup_dir, compression, stats)
+    assert len(list(backup_dir.glob("*.idx"))) == 1
+    if compression != "none":
+        assert stats["stored_bytes"] < stats["bytes"]
+
+    packs.restore(backup_dir, 1234, target)
+    for name, hash_code in manifest:
+        assert (target / name).read_text() == (source / name).read_text()
+
+    monkeypatch.setattr(packs, "current_time", lambda: 1235)
+    compressors = []
+    real_compressor = packs._compressor
+    monkeypatch.setattr(
+        packs, "_compressor", lambda codec: compressors.append(codec) or real_compressor(codec)
+    )
+    packs.backup(source, backup_dir, compression, stats)
+    assert stats["stored_bytes"] == 0
+    assert compressors == []
+    assert len(list(backup_dir.glob("*.pack"))) == 1
+
+
+def test_packs_in_same_second_do_not_collide(tmp_path, monkeypatch):
+    source, backup_dir, target = tmp_path / "src", tmp_path / "bck", tmp_path / "out"
+    source.mkdir()
+    (source / "a.txt").write_text("aaa")
+    monkeypatch.setattr(packs, "current_time", lambda: 1234)
+    packs.backup(source, backup_dir)
+    (source / "b.txt").write_text("bbb")
+    packs.backup(source, backup_dir)
+    assert len(list(backup_dir.glob("*.idx"))) == 2
+
+    packs.restore(backup_dir, 1234, target)
+    assert (target / "a.txt").read_text() == "aaa"
+    assert (target / "b.txt").read_text() == "bbb"
+
+
+def test_pack_of_empty_files(tmp_path, monkeypatch):
+    source, backup_dir, target = tmp_path / "src", tmp_path / "bck", tmp_path / "out"
+    source.mkdir()
+    (source / "e.txt").write_bytes(b"")
+    monkeypatch.setattr(packs, "current_time", lambda: 1234)
+    packs.backup(source, backup_dir, "none")
+    assert [p.stat().st_size for p in backup_dir.glob("*.pack")] == [0]
+    (source / "a.txt").write_text("aaa")
+    monkeypatch.setattr(packs, "current_time", lambda: 1235)
+    packs.backup(source, backup_dir, "none")
+
+    packs.restore(backup_dir, 1235, target)
+    assert (target / "e.txt").read_bytes() == b""
+    assert (target / "a.txt").read_text() == "aaa"
+
+
+def test_restore(tmp_path, monkeypatch):
+    source, backup_dir = tmp_path / "src", tmp_path / "bck"
+    for name, contents in FILES.items():
+        (source / name).parent.mkdir(parents=True, exist_ok=True)
+        (source / name).write_text(contents)
+    monkeypatch.setattr("backup.current_time", lambda: 1234)
+    backup(source, backup_dir)
+    for link in [False, True]:
+        target = tmp_path / f"out_{link}"
+        stats = restore.restore(backup_dir, 1234, target, workers=2, link=link)
+        assert sum(stats.values()) == len(FILES)
+        for name, contents in FILES.items():
+            assert (target / name).read_text() == contents
+    assert stats["link"] == len(FILES)
+
+
+def test_restore_reports_kernel_copies(tmp_path, monkeypatch):
+    source, backup_dir, target = tmp_path / "src", tmp_path / "bck", tmp_path / "out"
+    source.mkdir()
+    (source / "a.txt").write_text("aaa" * 1000)
+    monkeypatch.setattr("backup.current_time", lambda: 1234)
+    backup(source, backup_dir)
+
+    def no_reflink(fd, request, arg):
+        raise OSError(95, "Operation not supported")
+
+    monkeypatch.setattr(restore.fcntl, "ioctl", no_reflink)
+    stats = restore.restore(backup_dir, 1234, target)
+    assert (stats["clone"], stats["kernel_copy"]) == (0, 1)
+    assert (target / "a.txt").read_text() == "aaa" * 1000
+
+
+def test_manifest_diff(src_fs):
+    with patch("backup.current_time", return_value=1):
+        backup(".", "/backup")
+    with open("a.txt", "w") as writer:
+        writer.write("changed")
+    os.remove("b.txt")
+    with open("d.txt", "w") as writer:
+        writer.write("added")
+    with patch("backup.current_time", return_value=2):
+        backup(".", "/backup")
+    result = list(restore.diff("/backup/1.csv", "/backup/2.csv"))
+    assert result == [("changed", "a.txt"), ("removed", "b.txt"), ("added", "d.txt")]
@@ -0,0 +1,90 @@
+"""Time Builder._topo_sort against the previous rebuild-the-graph-per-level
+version on deep (chain) and wide (layered) graphs."""
+
+import random
+import sys
+import time
+
+from build_better import Builder
+from build_incremental import IncrementalBuilder
+
+SIZES = [1_000, 5_000, 100_000]
+OLD_LIMIT = 5_000
+
+
+def old_topo_sort(config):
+    graph = {n: config[n]['depends'] for n in config}
+    results = []
+    while graph:
+        available = {n for n in graph if not graph[n]}
+        assert available, "Circular graph"
+        results.extend(sorted(available))
+        graph = {
+            n: graph[n] - available
+            for n in graph
+            if n not in available
+        }
+    return results
+
+
+def chain(size):
+    return {
+        f"n{i:06d}": {"depends": {f"n{i - 1:06d}"} if i else set(), "rule": f"build {i}"}
+        for i in range(size)
+    }
+
+
+def layered(size, width=100, fan_in=3, seed=0):
+    rng = random.Random(seed)
+    config = {}
+    for i in range(size):
+        layer = i // width
+        below = range((layer - 1) * width, min(layer * width, size)) if layer else []
+        depends = {f"n{j:06d}" for j in rng.sample(below, min(fan_in, len(below)))}
+        config[f"n{i:06d}"] = {"depends": depends, "rule": f"build {i}"}
+    return config
+
+
+def timed(func, config):
+    start = time.perf_counter()
+    result = func(config)
+    return time.perf_counter() - start, result
+
+
+def main(sizes):
+    builder = Builder()
+    print(f"{'graph':<8} {'nodes':>7} {'old s':>8} {'kahn s':>8}")
+    for shape in (chain, layered):
+        for size in sizes:
+            config = shape(size)
+            new_time, new_order = timed(builder._topo_sort, config)
+            if size <= OLD_LIMIT:
+                old_time, old_order = timed(old_topo_sort, config)
+                assert old_order == new_order
+                old = f"{old_time:8.3f}"
+            else:
+                old = f"{'skipped':>8}"
+            print(f"{shape.__name__:<8} {size:>7} {old} {new_time:8.3f}")
+
+    incremental(max(sizes))
+
+
+def incremental(size, changes=100, seed=1):
+    """Apply single-node changes to a loaded graph vs re-sorting it"""
+    rng = random.Random(seed)
+    config = layered(size)
+    builder = IncrementalBuilder()
+    load_time, _ = timed(builder.load, config)
+    names = sorted(config)
+    start = time.perf_counter()
+    for _ in range(changes):
+        name = rng.choice(names[len(names) // 2:])
+        depends = set(rng.sample(names[:len(names) // 2], 2))
+        builder.modify(name, {"depends": depends, "rule": f"build {name}"})
+    delta_time = (time.perf_counter() - start) / changes
+    print(f"incremental, {size} nodes: load {load_time:.3f}s,"
+          f" {delta_time * 1000:.3f}ms per changed node")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
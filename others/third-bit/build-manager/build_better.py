@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 
 class Builder:
     def build(self, config_file):
@@ -14,7 +16,7 @@ class Builder:
     
     def _must(self, condition, message):
         if not condition:
-            raise ValueError("Message")
+            raise ValueError(message)
 
     def _configure(self, config):
         known = set(config.keys())
@@ -38,19 +40,39 @@ class Builder:
         )        
 
     def _topo_sort(self, config):
-        graph = {n: config[n]['depends'] for n in config}
+        # Kahn's algorithm, one level at a time so each level stays sorted
+        waiting = {n: len(config[n]['depends']) for n in config}
+        dependents = defaultdict(list)
+        for n in config:
+            for d in config[n]['depends']:
+                dependents[d].append(n)
+        level = sorted(n for n in config if not waiting[n])
         results = []
-        while graph:
-            available = {n for n in graph if not graph[n]}
-            self._must(available, f"Circular graph {graph}")
-            results.extend(sorted(available))
-            graph = {
-                n: graph[n] - available
-                for n in graph
-                if n not in available
-            }
+        while level:
+            results.extend(level)
+            ready = []
+            for n in level:
+                for m in dependents[n]:
+                    waiting[m] -= 1
+                    if not waiting[m]:
+                        ready.append(m)
+            level = sorted(ready)
+        if len(results) < len(config):
+            cycle = self._find_cycle(config, {n for n in waiting if waiting[n]})
+            self._must(False, f"Circular graph {' -> '.join(cycle)}")
         return results
 
+    def _find_cycle(self, config, stuck):
+        # every stuck node still waits on another stuck node, so
+        # following those dependencies must eventually loop
+        path, position = [], {}
+        node = min(stuck)
+        while node not in position:
+            position[node] = len(path)
+            path.append(node)
+            node = min(d for d in config[node]['depends'] if d in stuck)
+        return path[position[node]:] + [node]
+
 
 class BuildTime(Builder):
     def _check_keys(self, name, details):
@@ -84,6 +106,34 @@ def test_circular():
         pass
 
 
+def test_cycle_path_reported():
+    config = {
+        "A": {"depends": ["B"], "rule": "build A"},
+        "B": {"depends": ["C"], "rule": "build B"},
+        "C": {"depends": ["D"], "rule": "build C"},
+        "D": {"depends": ["B"], "rule": "build D"},
+        "E": {"depends": [], "rule": "build E"},
+    }
+    try:
+        Builder().build(config)
+        assert False, "should have had exception"
+    except ValueError as exc:
+        assert str(exc) == "Circular graph B -> C -> D -> B"
+
+
+def test_sorted_within_level():
+    config = {
+        "A": {"depends": ["C", "D"], "rule": "build A"},
+        "B": {"depends": ["D"], "rule": "build B"},
+        "C": {"depends": ["E"], "rule": "build C"},
+        "D": {"depends": [], "rule": "build D"},
+        "E": {"depends": [], "rule": "build E"},
+    }
+    assert Builder().build(config) == [
+        "build D", "build E", "build B", "build C", "build A"
+    ]
+
+
 def test_no_dep():
     action_A = "build A"
     action_B = "build B"
@@ -0,0 +1,142 @@
+from hashlib import sha256
+import json
+import os
+from pathlib import Path
+
+from build_better import Builder
+
+CHUNK_SIZE = 64 * 1024
+
+
+def file_digest(node):
+    """Hash of the file a node produces, or None if it doesn't exist"""
+    path = Path(node)
+    if not path.is_file():
+        return None
+    hasher = sha256()
+    with open(path, "rb") as reader:
+        while chunk := reader.read(CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class BuildHash(Builder):
+    """Decide what to rebuild from content hashes instead of times.
+
+    A node's key is the hash of its rule and of its dependencies' output
+    hashes. It is rebuilt when the key or its own output differs from the
+    last build. A dependency that is rebuilt but produces the same output
+    leaves its dependents' keys unchanged, so they are skipped."""
+
+    def __init__(self, db_file, run, digest=file_digest):
+        self._db_file = Path(db_file)
+        self._run = run
+        self._digest = digest
+
+    def build(self, config_file):
+        self._db = self._load()
+        self._outputs = {}
+        try:
+            return super().build(config_file)
+        finally:
+            # keep what did get built even if a later rule failed
+            self._save()
+
+    def _refresh(self, config, node, actions):
+        self._must(node in config, f"Unknown node {node}")
+        key = self._key(config, node)
+        output = self._digest(node)
+        previous = self._db.get(node)
+        if (previous is None) or (previous != {"key": key, "output": output}):
+            rule = config[node]["rule"]
+            actions.append(rule)
+            self._run(rule)
+            output = self._digest(node)
+        self._db[node] = {"key": key, "output": output}
+        self._outputs[node] = output
+
+    def _key(self, config, node):
+        hasher = sha256(config[node]["rule"].encode("utf-8"))
+        for d in sorted(config[node]["depends"]):
+            hasher.update(f"\0{d}\0{self._outputs[d]}".encode("utf-8"))
+        return hasher.hexdigest()
+
+    def _load(self):
+        if not self._db_file.exists():
+            return {}
+        with open(self._db_file, "r") as reader:
+            return json.load(reader)
+
+    def _save(self):
+        temp = Path(f"{self._db_file}.tmp")
+        with open(temp, "w") as writer:
+            json.dump(self._db, writer, indent=2, sort_keys=True)
+        os.replace(temp, self._db_file)
+
+
+class FakeFiles:
+    """Outputs kept in a dict; running 'make X' recomputes X from its inputs"""
+
+    def __init__(self, sources, recipes):
+        self.files = dict(sources)
+        self.recipes = recipes
+        self.ran = []
+
+    def run(self, rule):
+        self.ran.append(rule)
+        node = rule.split()[-1]
+        if node in self.recipes:
+            self.files[node] = self.recipes[node](self.files)
+
+    def digest(self, node):
+        if node not in self.files:
+            return None
+        return sha256(self.files[node].encode("utf-8")).hexdigest()
+
+
+def chain():
+    return {
+        "A": {"depends": ["B"], "rule": "make A"},
+        "B": {"depends": ["D"], "rule": "make B"},
+        "D": {"depends": [], "rule": "make D"},
+    }
+
+
+def chain_files():
+    return FakeFiles(
+        {"D": "hello"},
+        {"B": lambda f: str(len(f["D"])), "A": lambda f: f"A({f['B']})"},
+    )
+
+
+def test_second_build_does_nothing(tmp_path):
+    files = chain_files()
+    builder = BuildHash(tmp_path / "build.json", files.run, files.digest)
+    assert builder.build(chain()) == ["make D", "make B", "make A"]
+    assert builder.build(chain()) == []
+
+
+def test_changed_source_propagates(tmp_path):
+    files = chain_files()
+    builder = BuildHash(tmp_path / "build.json", files.run, files.digest)
+    builder.build(chain())
+    files.files["D"] = "hello, world"
+    assert builder.build(chain()) == ["make D", "make B", "make A"]
+    assert files.files["A"] == "A(12)"
+
+
+def test_early_cutoff(tmp_path):
+    files = chain_files()
+    builder = BuildHash(tmp_path / "build.json", files.run, files.digest)
+    builder.build(chain())
+    files.files["D"] = "jello"
+    assert builder.build(chain()) == ["make D", "make B"]
+
+
+def test_changed_rule_rebuilds_node(tmp_path):
+    files = chain_files()
+    builder = BuildHash(tmp_path / "build.json", files.run, files.digest)
+    builder.build(chain())
+    config = chain()
+    config["A"]["rule"] = "then make A"
+    assert builder.build(config) == ["then make A"]
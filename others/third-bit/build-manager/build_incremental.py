@@ -0,0 +1,214 @@
+from bisect import bisect_left, insort
+from collections import defaultdict
+import heapq
+import json
+import os
+from pathlib import Path
+
+from build_better import Builder
+
+
+class IncrementalBuilder(Builder):
+    """Keep the checked graph and its order between builds and patch them
+    when single nodes are added, removed or changed.
+
+    The order is the same one _topo_sort produces: nodes sorted by level
+    (the longest chain of dependencies below them) and then by name, so
+    a change only has to relevel the changed node and the nodes above it."""
+
+    def __init__(self):
+        self._config = {}
+        self._known = set()
+        self._levels = {}
+        self._dependents = defaultdict(set)
+        self._order = []
+
+    def load(self, config):
+        self._config = self._configure(config)
+        self._known = set(self._config)
+        self._dependents = defaultdict(set)
+        for n, details in self._config.items():
+            for d in details['depends']:
+                self._dependents[d].add(n)
+        self._levels = {}
+        for n in self._topo_sort(self._config):
+            self._levels[n] = self._level_of(n)
+        self._order = sorted((level, n) for n, level in self._levels.items())
+
+    def build(self, config_file=None):
+        if config_file is not None:
+            self.load(config_file)
+        actions = []
+        for _, node in self._order:
+            self._refresh(self._config, node, actions)
+        return actions
+
+    def order(self):
+        return [n for _, n in self._order]
+
+    def add(self, name, details):
+        self._must(name not in self._config, f"Node {name} already exists")
+        self._config[name] = self._check(name, details, self._known)
+        self._known.add(name)
+        for d in self._config[name]['depends']:
+            self._dependents[d].add(name)
+        self._levels[name] = self._level_of(name)
+        insort(self._order, (self._levels[name], name))
+
+    def remove(self, name):
+        self._must(name in self._config, f"Unknown node {name}")
+        users = self._dependents.get(name)
+        self._must(not users, f"{name} is still needed by {sorted(users or [])}")
+        for d in self._config.pop(name)['depends']:
+            self._dependents[d].discard(name)
+        self._dependents.pop(name, None)
+        self._known.discard(name)
+        self._unplace(name)
+        del self._levels[name]
+
+    def modify(self, name, details):
+        self._must(name in self._config, f"Unknown node {name}")
+        checked = self._check(name, details, self._known)
+        for d in checked['depends']:
+            self._must(not self._reaches(d, name), f"Circular graph via {name} and {d}")
+        for d in self._config[name]['depends']:
+            self._dependents[d].discard(name)
+        self._config[name] = checked
+        for d in checked['depends']:
+            self._dependents[d].add(name)
+        self._relevel(name)
+
+    def save(self, filename):
+        state = {
+            n: {**details, 'depends': sorted(details['depends']), 'level': self._levels[n]}
+            for n, details in self._config.items()
+        }
+        temp = Path(f"{filename}.tmp")
+        with open(temp, "w") as writer:
+            json.dump(state, writer)
+        os.replace(temp, filename)
+
+    def restore(self, filename):
+        """Reload a saved graph without checking or sorting it again"""
+        with open(filename, "r") as reader:
+            state = json.load(reader)
+        self._config, self._levels = {}, {}
+        self._known = set(state)
+        self._dependents = defaultdict(set)
+        for n, details in state.items():
+            self._levels[n] = details.pop('level')
+            details['depends'] = set(details['depends'])
+            self._config[n] = details
+            for d in details['depends']:
+                self._dependents[d].add(n)
+        self._order = sorted((level, n) for n, level in self._levels.items())
+
+    def _level_of(self, name):
+        depends = self._config[name]['depends']
+        return 1 + max((self._levels[d] for d in depends), default=-1)
+
+    def _reaches(self, start, target):
+        """Does start depend on target, directly or not? Only nodes above
+        target's level can, so the search stops below it."""
+        floor = self._levels[target]
+        seen, stack = {start}, [start]
+        while stack:
+            n = stack.pop()
+            if n == target:
+                return True
+            for d in self._config[n]['depends']:
+                if (d not in seen) and (self._levels[d] >= floor):
+                    seen.add(d)
+                    stack.append(d)
+        return False
+
+    def _relevel(self, name):
+        """Recompute name's level and pass changes up to its dependents.
+
+        Nodes are visited in their old order, which is still a valid
+        dependency order for everything above name, so each one is seen
+        after any of its dependencies that moved."""
+        heap, queued = [(self._levels[name], name)], {name}
+        while heap:
+            _, n = heapq.heappop(heap)
+            level = self._level_of(n)
+            if level == self._levels[n]:
+                continue
+            self._unplace(n)
+            self._levels[n] = level
+            insort(self._order, (level, n))
+            for m in self._dependents.get(n, ()):
+                if m not in queued:
+                    queued.add(m)
+                    heapq.heappush(heap, (self._levels[m], m))
+
+    def _unplace(self, name):
+        entry = (self._levels[name], name)
+        i = bisect_left(self._order, entry)
+        assert self._order[i] == entry
+        del self._order[i]
+
+
+def diamond():
+    return {
+        "A": {"depends": ["B", "C"], "rule": "build A"},
+        "B": {"depends": ["D"], "rule": "build B"},
+        "C": {"depends": ["D"], "rule": "build C"},
+        "D": {"depends": [], "rule": "build D"},
+    }
+
+
+def check_matches_full_sort(builder):
+    config = {n: dict(d) for n, d in builder._config.items()}
+    assert builder.order() == Builder()._topo_sort(config)
+
+
+def test_load_matches_builder():
+    builder = IncrementalBuilder()
+    assert builder.build(diamond()) == Builder().build(diamond())
+
+
+def test_deltas_keep_order():
+    builder = IncrementalBuilder()
+    builder.load(diamond())
+    builder.add("E", {"depends": [], "rule": "build E"})
+    builder.modify("D", {"depends": ["E"], "rule": "build D"})
+    check_matches_full_sort(builder)
+    assert builder.order() == ["E", "D", "B", "C", "A"]
+    builder.modify("C", {"depends": [], "rule": "build C"})
+    builder.add("F", {"depends": ["A", "C"], "rule": "build F"})
+    check_matches_full_sort(builder)
+    builder.remove("F")
+    builder.modify("D", {"depends": [], "rule": "rebuild D"})
+    builder.remove("E")
+    check_matches_full_sort(builder)
+    assert "rebuild D" in builder.build()
+
+
+def test_rejected_deltas_leave_graph_alone():
+    builder = IncrementalBuilder()
+    builder.load(diamond())
+    before = builder.order()
+    for change in [
+        lambda: builder.modify("D", {"depends": ["A"], "rule": "build D"}),
+        lambda: builder.remove("D"),
+        lambda: builder.add("A", {"depends": [], "rule": "build A"}),
+        lambda: builder.add("X", {"depends": ["Y"], "rule": "build X"}),
+    ]:
+        try:
+            change()
+            assert False, "should have had exception"
+        except ValueError:
+            pass
+    assert builder.order() == before
+
+
+def test_save_and_restore(tmp_path):
+    builder = IncrementalBuilder()
+    builder.load(diamond())
+    builder.save(tmp_path / "graph.json")
+    restored = IncrementalBuilder()
+    restored.restore(tmp_path / "graph.json")
+    assert restored.order() == builder.order()
+    restored.modify("B", {"depends": [], "rule": "build B"})
+    check_matches_full_sort(restored)
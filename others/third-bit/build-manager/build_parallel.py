@@ -0,0 +1,162 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from collections import defaultdict
+import heapq
+import threading
+import time
+
+from build_better import Builder, BuildTime
+
+
+class ParallelBuilder(Builder):
+    """Run rules on a pool of workers, starting each node as soon as its
+    own dependencies are done. When several nodes are ready the one with
+    the longest remaining path through the graph goes first."""
+
+    def __init__(self, run, workers=4, durations=None):
+        self._run = run
+        self._workers = workers
+        self.durations = durations or {}
+        self.timings = {}
+
+    def build(self, config_file):
+        config = self._configure(config_file)
+        ordered = self._topo_sort(config)
+        priority = self._critical_path(config, ordered)
+        waiting = {n: len(config[n]['depends']) for n in config}
+        dependents = self._dependents(config)
+        ready = [(-priority[n], n) for n in config if not waiting[n]]
+        heapq.heapify(ready)
+        actions, running, errors = [], {}, []
+        self.timings = {}
+        self._start = time.perf_counter()
+        with ThreadPoolExecutor(self._workers, thread_name_prefix="worker") as pool:
+            while ready or running:
+                while ready and len(running) < self._workers and not errors:
+                    _, node = heapq.heappop(ready)
+                    rules = []
+                    self._refresh(config, node, rules)
+                    actions.extend(rules)
+                    running[pool.submit(self._timed, node, rules)] = node
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    if future.exception() is not None:
+                        errors.append(future.exception())
+                        continue
+                    for m in dependents[node]:
+                        waiting[m] -= 1
+                        if not waiting[m]:
+                            heapq.heappush(ready, (-priority[m], m))
+        if errors:
+            raise errors[0]
+        return actions
+
+    def _timed(self, node, rules):
+        start = time.perf_counter() - self._start
+        for rule in rules:
+            self._run(rule)
+        self.timings[node] = {
+            "start": start,
+            "end": time.perf_counter() - self._start,
+            "worker": threading.current_thread().name,
+            "built": bool(rules),
+        }
+
+    def _critical_path(self, config, ordered):
+        """Longest chain of estimated durations from each node to the end"""
+        dependents = self._dependents(config)
+        length = {}
+        for n in reversed(ordered):
+            after = max((length[m] for m in dependents[n]), default=0)
+            length[n] = self.durations.get(n, 1) + after
+        return length
+
+    def _dependents(self, config):
+        dependents = defaultdict(list)
+        for n in config:
+            for d in config[n]['depends']:
+                dependents[d].append(n)
+        return dependents
+
+
+class ParallelBuildTime(ParallelBuilder, BuildTime):
+    pass
+
+
+def diamond():
+    return {
+        "A": {"depends": ["B", "C"], "rule": "build A", "time": 0},
+        "B": {"depends": ["D"], "rule": "build B", "time": 0},
+        "C": {"depends": ["D"], "rule": "build C", "time": 0},
+        "D": {"depends": [], "rule": "build D", "time": 1},
+    }
+
+
+class Recorder:
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.order = []
+        self.active = 0
+        self.most = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, rule):
+        with self.lock:
+            self.order.append(rule)
+            self.active += 1
+            self.most = max(self.most, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+
+
+def test_diamond_runs_middle_in_parallel():
+    run = Recorder()
+    builder = ParallelBuilder(run, workers=4)
+    builder.build(diamond())
+    assert run.order[0] == "build D"
+    assert set(run.order[1:3]) == {"build B", "build C"}
+    assert run.order[3] == "build A"
+    assert run.most == 2
+    timings = builder.timings
+    assert timings["A"]["start"] >= max(timings["B"]["end"], timings["C"]["end"])
+
+
+def test_critical_path_first():
+    config = {
+        "X1": {"depends": [], "rule": "build X1"},
+        "X2": {"depends": ["X1"], "rule": "build X2"},
+        "X3": {"depends": ["X2"], "rule": "build X3"},
+        "Y": {"depends": [], "rule": "build Y"},
+        "Z": {"depends": [], "rule": "build Z"},
+    }
+    run = Recorder(delay=0)
+    ParallelBuilder(run, workers=1).build(config)
+    assert run.order[0] == "build X1"
+    heavy = ParallelBuilder(Recorder(delay=0), workers=1, durations={"Z": 10})
+    assert heavy.build(config)[0] == "build Z"
+
+
+def test_only_stale_nodes_run():
+    config = diamond()
+    config["C"]["time"] = 1
+    run = Recorder(delay=0)
+    builder = ParallelBuildTime(run, workers=2)
+    assert builder.build(config) == ["build B", "build A"]
+    assert run.order == ["build B", "build A"]
+    assert not builder.timings["C"]["built"]
+
+
+def test_failure_stops_build():
+    def run(rule):
+        if rule == "build B":
+            raise RuntimeError("B failed")
+    builder = ParallelBuilder(run, workers=2)
+    try:
+        builder.build(diamond())
+        assert False, "should have had exception"
+    except RuntimeError:
+        pass
+    assert "A" not in builder.timings
@@ -0,0 +1,169 @@
+"""Profile builds: write each build as a Chrome trace (load it in
+chrome://tracing or Perfetto), remember how long each rule took, and use
+those times to estimate a build before running it."""
+
+import json
+import os
+from pathlib import Path
+
+from build_better import Builder
+from build_parallel import ParallelBuilder, ParallelBuildTime, Recorder, diamond
+
+SMOOTHING = 0.5
+
+
+def chrome_trace(timings):
+    workers = sorted({timing["worker"] for timing in timings.values()})
+    tids = {name: i for i, name in enumerate(workers)}
+    events = [
+        {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+        for name, tid in tids.items()
+    ]
+    for node, timing in sorted(timings.items(), key=lambda item: item[1]["start"]):
+        events.append({
+            "name": node,
+            "cat": "rebuilt" if timing["built"] else "cached",
+            "ph": "X",
+            "ts": timing["start"] * 1e6,
+            "dur": (timing["end"] - timing["start"]) * 1e6,
+            "pid": 1,
+            "tid": tids[timing["worker"]],
+            "args": {"built": timing["built"]},
+        })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def write_trace(timings, filename):
+    with open(filename, "w") as writer:
+        json.dump(chrome_trace(timings), writer)
+
+
+class History:
+    """Smoothed duration of each node's rule over past builds"""
+
+    def __init__(self, filename):
+        self._filename = Path(filename)
+        self.durations = {}
+        if self._filename.exists():
+            with open(self._filename, "r") as reader:
+                self.durations = json.load(reader)
+
+    def update(self, timings):
+        for node, timing in timings.items():
+            if not timing["built"]:
+                continue
+            took = timing["end"] - timing["start"]
+            old = self.durations.get(node, took)
+            self.durations[node] = SMOOTHING * took + (1 - SMOOTHING) * old
+
+    def save(self):
+        temp = Path(f"{self._filename}.tmp")
+        with open(temp, "w") as writer:
+            json.dump(self.durations, writer, indent=2, sort_keys=True)
+        os.replace(temp, self._filename)
+
+    def guess(self, node):
+        if node in self.durations:
+            return self.durations[node]
+        if self.durations:
+            return sum(self.durations.values()) / len(self.durations)
+        return 0.0
+
+
+def estimate(builder, config, history, top=5):
+    """Dry run: which nodes would be rebuilt, their total time, and the
+    longest chain of them (the least time any number of workers needs)"""
+    config = builder._configure(config)
+    ordered = builder._topo_sort(config)
+    cost, rebuilt = {}, []
+    for node in ordered:
+        actions = []
+        builder._refresh(config, node, actions)
+        if actions:
+            rebuilt.append(node)
+        cost[node] = history.guess(node) if actions else 0.0
+
+    finish, via = {}, {}
+    for node in ordered:
+        before = max(config[node]['depends'], key=lambda d: finish[d], default=None)
+        via[node] = before
+        finish[node] = cost[node] + (finish[before] if before else 0.0)
+    path, node = [], max(ordered, key=lambda n: finish[n], default=None)
+    while node is not None:
+        path.append(node)
+        node = via[node]
+
+    return {
+        "rebuilt": rebuilt,
+        "total": sum(cost.values()),
+        "critical_path": finish[path[0]] if path else 0.0,
+        "path": list(reversed(path)),
+        "slowest": sorted(
+            ((n, cost[n]) for n in rebuilt), key=lambda item: -item[1]
+        )[:top],
+    }
+
+
+def traced_build(builder, config, history_file, trace_file=None):
+    """Estimate, build with historical critical-path priorities, then
+    record the new timings and optionally write a trace"""
+    history = History(history_file)
+    predicted = estimate(builder, config, history)
+    # with no history at all, keep the builder's default weight per node;
+    # guesses of 0 would flatten every priority
+    if history.durations:
+        builder.durations = {n: history.guess(n) for n in config}
+    actions = builder.build(config)
+    history.update(builder.timings)
+    history.save()
+    if trace_file is not None:
+        write_trace(builder.timings, trace_file)
+    return actions, predicted
+
+
+def test_estimate_from_history(tmp_path):
+    history = History(tmp_path / "history.json")
+    history.durations = {"A": 1.0, "B": 5.0, "C": 2.0, "D": 3.0}
+    result = estimate(Builder(), diamond(), history)
+    assert result["total"] == 11.0
+    assert result["critical_path"] == 9.0
+    assert result["path"] == ["D", "B", "A"]
+    assert result["slowest"][0] == ("B", 5.0)
+
+
+def test_estimate_skips_up_to_date_nodes(tmp_path):
+    history = History(tmp_path / "history.json")
+    history.durations = {"A": 1.0, "B": 5.0, "C": 2.0, "D": 3.0}
+    config = diamond()
+    config["C"]["time"] = 1
+    result = estimate(ParallelBuildTime(Recorder()), config, history)
+    assert result["rebuilt"] == ["B", "A"]
+    assert result["total"] == 6.0
+
+
+def test_traced_build(tmp_path):
+    builder = ParallelBuilder(Recorder(delay=0.01), workers=2)
+    actions, predicted = traced_build(
+        builder, diamond(), tmp_path / "history.json", tmp_path / "trace.json"
+    )
+    assert len(actions) == 4
+    assert predicted["total"] == 0.0
+    with open(tmp_path / "trace.json") as reader:
+        events = [e for e in json.load(reader)["traceEvents"] if e["ph"] != "M"]
+    assert events[0]["name"] == "D"
+    assert all(e["ph"] == "X" and e["dur"] > 0 for e in events)
+
+    again = ParallelBuilder(Recorder(delay=0.01), workers=2)
+    _, predicted = traced_build(again, diamond(), tmp_path / "history.json")
+    assert 0.02 < predicted["critical_path"] < predicted["total"]
+
+
+def test_first_traced_build_uses_critical_path(tmp_path):
+    config = {
+        "X1": {"depends": [], "rule": "build X1"},
+        "X2": {"depends": ["X1"], "rule": "build X2"},
+        "A": {"depends": [], "rule": "build A"},
+    }
+    run = Recorder(delay=0)
+    traced_build(ParallelBuilder(run, workers=1), config, tmp_path / "history.json")
+    assert run.order[0] == "build X1"
@@ -0,0 +1,65 @@
+"""Compare grouped_sha and staged duplicate finding on a synthetic tree."""
+
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import grouped_sha
+import staged
+
+
+def make_tree(root, count, size, seed=0):
+    """Files that are: unique in size, same size but different heads,
+    same size and same head/tail but different middles, or duplicates"""
+    rng = random.Random(seed)
+    filenames = []
+
+    def write(name, data):
+        path = Path(root, name)
+        path.write_bytes(data)
+        filenames.append(str(path))
+
+    shared = rng.randbytes(size)
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            write(f"unique_{i}.bin", rng.randbytes(size + i))
+        elif kind == 1:
+            write(f"head_{i}.bin", i.to_bytes(8, "little") + shared[8:])
+        elif kind == 2:
+            middle = size // 2
+            data = shared[:middle] + i.to_bytes(8, "little") + shared[middle + 8:]
+            write(f"middle_{i}.bin", data)
+        else:
+            write(f"dup_{i}.bin", shared)
+    return filenames
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main(count=400, size=256 * 1024):
+    with tempfile.TemporaryDirectory() as root:
+        filenames = make_tree(root, count, size)
+        stats = {}
+        sha_time, sha_groups = timed(grouped_sha.find_groups, filenames)
+        staged_time, staged_groups = timed(staged.find_groups, filenames, stats)
+
+    duplicates = [g for g in sha_groups.values() if len(g) > 1]
+    assert sorted(map(sorted, duplicates)) == sorted(map(sorted, staged_groups.values()))
+    print(f"{count} files of ~{size} bytes")
+    print(f"grouped_sha: {sha_time:.3f}s")
+    print(f"staged:      {staged_time:.3f}s")
+    print(f"eliminated by size:         {stats['files'] - stats['after_size']}")
+    print(f"eliminated by partial hash: {stats['after_size'] - stats['after_partial']}")
+    print(f"eliminated by full hash:    {stats['after_partial'] - stats['after_full']}")
+    print(f"duplicates confirmed:       {stats['after_full']}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -1,5 +1,8 @@
 import sys
 
+from compare import same_bytes
+
+
 def find_duplicates(filenames):
     matches = []
     for i_left in range(len(filenames)):
@@ -11,13 +14,6 @@ def find_duplicates(filenames):
     return matches
 
 
-
-def same_bytes(left_name, right_name):
-    left_bytes = open(left_name, "rb").read()
-    right_bytes = open(right_name, "rb").read()
-    return left_bytes == right_bytes
-
-
 if __name__ == "__main__":
     duplicates = find_duplicates(sys.argv[1:])
     for left, right in duplicates:
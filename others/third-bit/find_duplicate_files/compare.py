@@ -0,0 +1,121 @@
+"""Compare file contents chunk by chunk, stopping at the first difference."""
+
+from collections import defaultdict
+import os
+
+CHUNK_SIZE = 64 * 1024
+# groups bigger than this reopen files for each chunk instead of
+# holding one descriptor per file
+MAX_OPEN = 256
+
+
+def same_bytes(left_name, right_name):
+    if os.path.getsize(left_name) != os.path.getsize(right_name):
+        return False
+    left_buffer = memoryview(bytearray(CHUNK_SIZE))
+    right_buffer = memoryview(bytearray(CHUNK_SIZE))
+    with open(left_name, "rb") as left, open(right_name, "rb") as right:
+        while True:
+            left_count = left.readinto(left_buffer)
+            right_count = right.readinto(right_buffer)
+            if left_buffer[:left_count] != right_buffer[:right_count]:
+                return False
+            if left_count == 0:
+                return True
+
+
+def partition(filenames):
+    """Split filenames into lists of files with identical contents.
+
+    Every candidate group is read one chunk at a time and split by the
+    bytes of that chunk, so each file is read once and files drop out
+    as soon as their contents become unique."""
+    result = []
+    by_size = defaultdict(list)
+    for filename in filenames:
+        by_size[os.path.getsize(filename)].append(filename)
+    active = [group for group in by_size.values() if len(group) > 1]
+    handles = {}
+    if sum(len(group) for group in active) <= MAX_OPEN:
+        handles = {f: open(f, "rb") for group in active for f in group}
+    try:
+        offset = 0
+        while active:
+            still_active = []
+            for group in active:
+                split = defaultdict(list)
+                for filename in group:
+                    split[_read_chunk(filename, offset, handles)].append(filename)
+                for chunk, members in split.items():
+                    if len(members) < 2:
+                        _close(members, handles)
+                    elif chunk:
+                        still_active.append(members)
+                    else:
+                        result.append(members)
+                        _close(members, handles)
+            active = still_active
+            offset += CHUNK_SIZE
+    finally:
+        _close(list(handles), handles)
+    return result
+
+
+def _read_chunk(filename, offset, handles):
+    if filename in handles:
+        return handles[filename].read(CHUNK_SIZE)
+    with open(filename, "rb") as reader:
+        reader.seek(offset)
+        return reader.read(CHUNK_SIZE)
+
+
+def _close(filenames, handles):
+    for filename in filenames:
+        if filename in handles:
+            handles.pop(filename).close()
+
+
+def write_files(tmp_path, contents):
+    names = []
+    for i, data in enumerate(contents):
+        path = tmp_path / f"f{i}.bin"
+        path.write_bytes(data)
+        names.append(str(path))
+    return names
+
+
+def test_difference_in_later_chunk(tmp_path):
+    base = bytes(3 * CHUNK_SIZE)
+    changed = base[:-1] + b"x"
+    first, second, third = write_files(tmp_path, [base, base, changed])
+    assert same_bytes(first, second)
+    assert not same_bytes(first, third)
+    assert partition([first, second, third]) == [[first, second]]
+
+
+def test_empty_files(tmp_path):
+    first, second, full = write_files(tmp_path, [b"", b"", b"x"])
+    assert same_bytes(first, second)
+    assert not same_bytes(first, full)
+    assert partition([first, second, full]) == [[first, second]]
+
+
+def test_more_candidates_than_open_files(tmp_path, monkeypatch):
+    import compare
+    monkeypatch.setattr(compare, "MAX_OPEN", 3)
+    base = bytes(2 * CHUNK_SIZE + 10)
+    other = base[:CHUNK_SIZE + 5] + b"x" + base[CHUNK_SIZE + 6:]
+    names = write_files(tmp_path, [base, other, base, other, base, b"short"])
+    opened = []
+    real_open = open
+
+    def counting_open(name, *args):
+        opened.append(name)
+        return real_open(name, *args)
+
+    monkeypatch.setattr("builtins.open", counting_open)
+    groups = sorted(partition(names))
+    assert groups == [names[0:5:2], names[1:4:2]]
+    # no handles kept, so every chunk reopens and seeks: three chunks of
+    # data and an empty read at the end
+    assert opened.count(names[0]) == 4
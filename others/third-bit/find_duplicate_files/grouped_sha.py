@@ -6,7 +6,8 @@ from collections import defaultdict
 def find_groups(filenames):
     groups = defaultdict(set)
     for filename in filenames:
-        content = open(filename, "rb").read()
+        with open(filename, "rb") as reader:
+            content = reader.read()
         hash_code = sha256(content).hexdigest()
         groups[hash_code].add(filename)
     return groups
@@ -0,0 +1,171 @@
+"""Stream duplicate groups from scanner.scan as JSON lines, optionally
+replace duplicates with hard links, and summarise the run. Each group is
+handled and dropped as soon as it arrives."""
+
+import argparse
+import json
+import os
+import secrets
+import sys
+import time
+
+from compare import same_bytes
+from scanner import WORKERS, HashCache, scan
+
+
+def report(groups, out, hardlink=False):
+    stats = {"groups": 0, "duplicates": 0, "reclaimable": 0, "linked": 0,
+             "failed": 0, "skipped": 0}
+    for size, hash_code, paths in groups:
+        inodes, present = {}, []
+        for path in paths:
+            try:
+                info = os.stat(path)
+            except OSError:
+                # deleted or made unreadable since it was hashed
+                stats["skipped"] += 1
+                continue
+            present.append(path)
+            inodes.setdefault((info.st_dev, info.st_ino), path)
+        if len(present) < 2:
+            continue
+        paths = present
+        reclaimable = size * (len(inodes) - 1)
+        record = {"size": size, "hash": hash_code, "paths": paths,
+                  "reclaimable": reclaimable}
+        if hardlink:
+            linked, failed = link_group(list(inodes.values()))
+            record["linked"] = linked
+            stats["linked"] += len(linked)
+            stats["failed"] += failed
+        out.write(json.dumps(record) + "\n")
+        stats["groups"] += 1
+        stats["duplicates"] += len(paths) - 1
+        stats["reclaimable"] += reclaimable
+    return stats
+
+
+def link_group(paths):
+    """Replace paths[1:] with hard links to paths[0], checking the bytes
+    again first in case a file changed since it was hashed"""
+    keep, linked, failed = paths[0], [], 0
+    for path in paths[1:]:
+        temp = None
+        try:
+            if not same_bytes(keep, path):
+                failed += 1
+                continue
+            temp = link_beside(keep, path)
+            os.replace(temp, path)
+            temp = None
+            linked.append(path)
+        except OSError:
+            failed += 1
+            if temp is not None:
+                os.remove(temp)
+    return linked, failed
+
+
+def link_beside(keep, path):
+    """Hard-link keep to an unused name in path's directory, never
+    touching a file that is already there"""
+    directory, name = os.path.split(path)
+    while True:
+        temp = os.path.join(directory, f".{name}.{secrets.token_hex(4)}.dup-link")
+        try:
+            os.link(keep, temp)
+            return temp
+        except FileExistsError:
+            continue
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("roots", nargs="+")
+    parser.add_argument("--cache", help="SQLite file to keep hashes in")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--output", help="JSON-lines file for groups (default stdout)")
+    parser.add_argument("--hardlink", action="store_true",
+                        help="replace duplicates with hard links to the first file")
+    args = parser.parse_args()
+
+    cache = HashCache(args.cache) if args.cache else None
+    out = open(args.output, "w") if args.output else sys.stdout
+    scanned = {}
+    start = time.perf_counter()
+    try:
+        groups = scan(args.roots, cache, args.workers, scanned)
+        stats = report(groups, out, args.hardlink)
+    finally:
+        if cache is not None:
+            cache.close()
+        if args.output:
+            out.close()
+    seconds = time.perf_counter() - start
+    summary = {
+        **scanned, **stats, "skipped": scanned["skipped"] + stats["skipped"],
+        "seconds": round(seconds, 3),
+        "files_per_second": round(scanned["files"] / max(seconds, 1e-9)),
+        "hashed_bytes_per_second": round(scanned["bytes_hashed"] / max(seconds, 1e-9)),
+    }
+    print(json.dumps(summary), file=sys.stderr)
+
+
+def make_pair(tmp_path, first="same", second="same"):
+    keep, other = tmp_path / "a.txt", tmp_path / "b.txt"
+    keep.write_text(first)
+    other.write_text(second)
+    return str(keep), str(other)
+
+
+def test_report_skips_files_gone_since_hashing(tmp_path):
+    import io
+    names = [str(tmp_path / name) for name in ("a", "b", "c", "d", "e")]
+    for name in names[:2] + names[3:4]:
+        with open(name, "w") as writer:
+            writer.write("same")
+    out = io.StringIO()
+    groups = [(4, "h1", names[:3]), (4, "h2", names[3:])]
+    stats = report(groups, out)
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [record["paths"] for record in records] == [names[:2]]
+    assert stats["groups"] == 1
+    assert stats["duplicates"] == 1
+    assert stats["skipped"] == 2
+
+
+def test_hardlink_replaces_duplicate(tmp_path):
+    keep, other = make_pair(tmp_path)
+    assert link_group([keep, other]) == ([other], 0)
+    assert os.path.samefile(keep, other)
+    assert sorted(os.listdir(tmp_path)) == ["a.txt", "b.txt"]
+
+
+def test_hardlink_leaves_existing_temp_names_alone(tmp_path):
+    keep, other = make_pair(tmp_path)
+    precious = tmp_path / "b.txt.dup-link"
+    precious.write_text("precious")
+    assert link_group([keep, other]) == ([other], 0)
+    assert precious.read_text() == "precious"
+
+
+def test_hardlink_skips_changed_file(tmp_path):
+    keep, other = make_pair(tmp_path, second="changed")
+    assert link_group([keep, other]) == ([], 1)
+    assert not os.path.samefile(keep, other)
+
+
+def test_hardlink_failure_removes_only_its_own_link(tmp_path, monkeypatch):
+    keep, other = make_pair(tmp_path)
+
+    def refuse(src, dst):
+        raise PermissionError(dst)
+
+    monkeypatch.setattr(os, "replace", refuse)
+    assert link_group([keep, other]) == ([], 1)
+    assert sorted(os.listdir(tmp_path)) == ["a.txt", "b.txt"]
+    assert not os.path.samefile(keep, other)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Walk directory trees, hash same-size files in a thread pool, and print
+each group of duplicates as soon as every file of that size is hashed.
+Hashes are cached in SQLite keyed by (path, size, mtime) between runs."""
+
+import argparse
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import os
+import sqlite3
+
+from staged import full_hash
+
+WORKERS = 8
+IN_FLIGHT = 4 * WORKERS
+
+
+def walk(root, skipped=None):
+    """Yield (path, size, mtime_ns) for every regular file under root,
+    adding directories and files that cannot be read to skipped"""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            _skip(skipped, directory)
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                        continue
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    info = entry.stat(follow_symlinks=False)
+                except OSError:
+                    _skip(skipped, entry.path)
+                    continue
+                yield entry.path, info.st_size, info.st_mtime_ns
+
+
+def _skip(skipped, path):
+    if skipped is not None:
+        skipped.append(path)
+
+
+class HashCache:
+    def __init__(self, filename):
+        self._db = sqlite3.connect(filename)
+        self._db.execute(
+            "create table if not exists hashes"
+            " (path text primary key, size integer, mtime_ns integer, hash text)"
+        )
+
+    def get(self, path, size, mtime_ns):
+        row = self._db.execute(
+            "select hash from hashes where path = ? and size = ? and mtime_ns = ?",
+            (os.path.abspath(path), size, mtime_ns),
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, path, size, mtime_ns, hash_code):
+        self._db.execute(
+            "insert or replace into hashes values (?, ?, ?, ?)",
+            (os.path.abspath(path), size, mtime_ns, hash_code),
+        )
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+
+class NoCache:
+    def get(self, path, size, mtime_ns):
+        return None
+
+    def put(self, path, size, mtime_ns, hash_code):
+        pass
+
+    def close(self):
+        pass
+
+
+def scan(roots, cache=None, workers=WORKERS, stats=None):
+    """Yield (size, hash, paths) for each group of duplicates; the cache is
+    only touched from this thread, the pool only reads files"""
+    cache = NoCache() if cache is None else cache
+    # the first walk only counts sizes, so the names of files with a
+    # unique size (usually most of them) are never held in memory
+    size_counts = Counter(size for root in roots for _, size, _ in walk(root))
+    by_size = defaultdict(list)
+    skipped = []
+    for root in roots:
+        for path, size, mtime_ns in walk(root, skipped):
+            if size_counts.get(size, 0) > 1:
+                by_size[size].append((path, mtime_ns))
+    candidates = [(size, files) for size, files in by_size.items() if len(files) > 1]
+    counts = {
+        "files": sum(size_counts.values()), "hashed": 0, "cached": 0,
+        "bytes_hashed": 0, "skipped": len(skipped),
+    }
+    del size_counts, by_size, skipped
+
+    hashes = defaultdict(list)
+    remaining = {}
+    pending = {}
+
+    def resolve(size, path, hash_code):
+        if hash_code is not None:
+            hashes[size].append((hash_code, path))
+        remaining[size] -= 1
+        if remaining[size] == 0:
+            return _groups(size, hashes.pop(size))
+        return []
+
+    with ThreadPoolExecutor(workers) as pool:
+        for size, files in candidates:
+            remaining[size] = len(files)
+            for path, mtime_ns in files:
+                hash_code = cache.get(path, size, mtime_ns)
+                if hash_code is not None:
+                    counts["cached"] += 1
+                    yield from resolve(size, path, hash_code)
+                    continue
+                while len(pending) >= max(IN_FLIGHT, workers):
+                    yield from _collect(pending, cache, counts, resolve)
+                pending[pool.submit(full_hash, path)] = (size, path, mtime_ns)
+        while pending:
+            yield from _collect(pending, cache, counts, resolve)
+
+    if stats is not None:
+        stats.update(counts)
+
+
+def _collect(pending, cache, counts, resolve):
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        size, path, mtime_ns = pending.pop(future)
+        try:
+            hash_code = future.result()
+        except OSError:
+            # vanished or unreadable since the walk: the rest of its
+            # size group can still be matched
+            counts["skipped"] += 1
+            yield from resolve(size, path, None)
+            continue
+        cache.put(path, size, mtime_ns, hash_code)
+        counts["hashed"] += 1
+        counts["bytes_hashed"] += size
+        yield from resolve(size, path, hash_code)
+
+
+def _groups(size, hashed):
+    by_hash = defaultdict(list)
+    for hash_code, path in hashed:
+        by_hash[hash_code].append(path)
+    return [
+        (size, hash_code, sorted(paths))
+        for hash_code, paths in by_hash.items()
+        if len(paths) > 1
+    ]
+
+
+def make_tree(tmp_path):
+    for name, contents in [("a.txt", "same"), ("b.txt", "same"),
+                           ("sub/c.txt", "same"), ("sub/d.txt", "other")]:
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).write_text(contents)
+
+
+def test_scan_finds_groups(tmp_path):
+    make_tree(tmp_path)
+    stats = {}
+    groups = list(scan([str(tmp_path)], stats=stats))
+    assert [len(paths) for _, _, paths in groups] == [3]
+    assert stats["skipped"] == 0
+
+
+def test_unreadable_directory_is_skipped(tmp_path, monkeypatch):
+    make_tree(tmp_path)
+    real_scandir = os.scandir
+
+    def scandir(path):
+        if path.endswith("sub"):
+            raise PermissionError(path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", scandir)
+    stats = {}
+    groups = list(scan([str(tmp_path)], stats=stats))
+    assert [len(paths) for _, _, paths in groups] == [2]
+    assert stats["skipped"] == 1
+
+
+def test_unreadable_file_is_skipped(tmp_path, monkeypatch):
+    make_tree(tmp_path)
+    import scanner
+    import staged
+
+    def flaky_hash(path):
+        if path.endswith("c.txt"):
+            raise FileNotFoundError(path)
+        return staged.full_hash(path)
+
+    monkeypatch.setattr(scanner, "full_hash", flaky_hash)
+    stats = {}
+    groups = list(scan([str(tmp_path)], stats=stats))
+    assert [len(paths) for _, _, paths in groups] == [2]
+    assert stats["skipped"] == 1
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("roots", nargs="+")
+    parser.add_argument("--cache", help="SQLite file to keep hashes in")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
+
+    cache = HashCache(args.cache) if args.cache else None
+    stats = {}
+    try:
+        for size, hash_code, paths in scan(args.roots, cache, args.workers, stats):
+            print(", ".join(paths), flush=True)
+    finally:
+        if cache is not None:
+            cache.close()
+    print(
+        f"{stats['files']} files, hashed {stats['hashed']},"
+        f" reused {stats['cached']} cached hashes, skipped {stats['skipped']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
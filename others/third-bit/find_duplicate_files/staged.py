@@ -0,0 +1,154 @@
+"""Find duplicates in stages, each cheaper than the next: group by size,
+then by a hash of the first and last few KB, and only fully hash the
+files that still share a group."""
+
+import os
+import sys
+from collections import defaultdict
+from hashlib import sha256
+
+PARTIAL_SIZE = 4 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+def find_groups(filenames, stats=None):
+    groups = refine({(): filenames}, os.path.getsize)
+    sizes = _count(groups)
+    groups = refine(groups, partial_hash)
+    partials = _count(groups)
+    groups = {**_covered(groups), **refine(_uncovered(groups), full_hash)}
+    if stats is not None:
+        stats["files"] = len(filenames)
+        stats["after_size"] = sizes
+        stats["after_partial"] = partials
+        stats["after_full"] = _count(groups)
+    return {keys[-1]: group for keys, group in groups.items()}
+
+
+def refine(groups, key):
+    """Split each group by key, dropping files left on their own"""
+    result = {}
+    for keys, group in groups.items():
+        split = defaultdict(set)
+        for filename in group:
+            split[key(filename)].add(filename)
+        for k, g in split.items():
+            if len(g) > 1:
+                result[(*keys, k)] = g
+    return result
+
+
+def partial_hash(filename):
+    size = os.path.getsize(filename)
+    with open(filename, "rb") as reader:
+        if size <= 2 * PARTIAL_SIZE:
+            return sha256(reader.read()).hexdigest()
+        hasher = sha256(reader.read(PARTIAL_SIZE))
+        reader.seek(size - PARTIAL_SIZE)
+        hasher.update(reader.read(PARTIAL_SIZE))
+        return hasher.hexdigest()
+
+
+def _covered(groups):
+    """Groups of files small enough that the partial hash read all of
+    them: it is already their full hash, so carry it forward"""
+    return {
+        (*keys, keys[-1]): group
+        for keys, group in groups.items()
+        if keys[0] <= 2 * PARTIAL_SIZE
+    }
+
+
+def _uncovered(groups):
+    return {
+        keys: group
+        for keys, group in groups.items()
+        if keys[0] > 2 * PARTIAL_SIZE
+    }
+
+
+def full_hash(filename):
+    hasher = sha256()
+    buffer = memoryview(bytearray(CHUNK_SIZE))
+    with open(filename, "rb") as reader:
+        while count := reader.readinto(buffer):
+            hasher.update(buffer[:count])
+    return hasher.hexdigest()
+
+
+def _count(groups):
+    return sum(len(g) for g in groups.values())
+
+
+def write_files(tmp_path, contents):
+    names = []
+    for name, data in contents.items():
+        (tmp_path / name).write_bytes(data)
+        names.append(str(tmp_path / name))
+    return names
+
+
+def test_refine_splits_and_drops_singletons():
+    groups = refine({("k",): {"a1", "a2", "b1", "c1", "c2"}}, lambda f: f[0])
+    assert groups == {("k", "a"): {"a1", "a2"}, ("k", "c"): {"c1", "c2"}}
+
+
+def test_covered_and_uncovered_split_on_size():
+    small, large = 2 * PARTIAL_SIZE, 2 * PARTIAL_SIZE + 1
+    groups = {(small, "p1"): {"a", "b"}, (large, "p2"): {"c", "d"}}
+    assert _covered(groups) == {(small, "p1", "p1"): {"a", "b"}}
+    assert _uncovered(groups) == {(large, "p2"): {"c", "d"}}
+
+
+def test_unique_sizes_are_never_hashed(tmp_path, monkeypatch):
+    import staged
+    names = write_files(tmp_path, {"a": b"1", "b": b"22", "c": b"333"})
+
+    def fail(filename):
+        raise AssertionError(f"hashed {filename}")
+
+    monkeypatch.setattr(staged, "partial_hash", fail)
+    stats = {}
+    assert find_groups(names, stats) == {}
+    assert stats == {"files": 3, "after_size": 0, "after_partial": 0, "after_full": 0}
+
+
+def test_same_head_and_tail_split_by_full_hash(tmp_path):
+    head, tail = b"h" * PARTIAL_SIZE, b"t" * PARTIAL_SIZE
+    names = write_files(tmp_path, {
+        "a": head + b"x" * PARTIAL_SIZE + tail,
+        "b": head + b"y" * PARTIAL_SIZE + tail,
+        "c": head + b"x" * PARTIAL_SIZE + tail,
+        "d": b"d" * (3 * PARTIAL_SIZE),
+    })
+    stats = {}
+    groups = find_groups(names, stats)
+    assert list(groups.values()) == [{names[0], names[2]}]
+    assert stats == {"files": 4, "after_size": 4, "after_partial": 3, "after_full": 2}
+
+
+def test_small_files_use_partial_hash_as_full_hash(tmp_path, monkeypatch):
+    import staged
+    names = write_files(tmp_path, {"a": b"same", "b": b"same", "c": b"diff"})
+    expected = full_hash(names[0])
+
+    def fail(filename):
+        raise AssertionError(f"read {filename} again")
+
+    monkeypatch.setattr(staged, "full_hash", fail)
+    stats = {}
+    assert find_groups(names, stats) == {expected: {names[0], names[1]}}
+    assert stats == {"files": 3, "after_size": 3, "after_partial": 2, "after_full": 2}
+
+
+if __name__ == "__main__":
+    stats = {}
+    groups = find_groups(sys.argv[1:], stats)
+    for filenames in groups.values():
+        print(", ".join(sorted(filenames)))
+    print(
+        f"{stats['files']} files; candidates after size: {stats['after_size']},"
+        f" after partial hash: {stats['after_partial']},"
+        f" after full hash: {stats['after_full']}",
+        file=sys.stderr,
+    )
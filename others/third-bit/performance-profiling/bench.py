@@ -0,0 +1,80 @@
+"""Benchmark suite for the DataFrame backends.
+
+    python bench.py [--json out.json] [--baseline base.json] [--repeat N]
+"""
+
+import argparse
+import sys
+
+from harness import REPEAT, THRESHOLD, WARMUP, compare, load, measure, save
+from timing import filter_label_0, make_col, make_row, select_labels
+
+SIZES = [(10, 10), (100, 100), (500, 500), (1000, 1000)]
+BACKENDS = {
+    "col": make_col,
+    "cat": lambda nrow, ncol: make_col(nrow, ncol, categorical=True),
+    "row": make_row,
+}
+
+
+def run(sizes=SIZES, repeat=REPEAT, warmup=WARMUP):
+    results = []
+    for (nrow, ncol) in sizes:
+        for backend, make in BACKENDS.items():
+            df = make(nrow, ncol)
+            labels = select_labels(df)
+            cases = {
+                "filter": lambda: df.filter(filter_label_0),
+                "filter_eq": lambda: df.filter_eq("label_0", 1),
+                "select": lambda: df.select(*labels),
+            }
+            for name, func in cases.items():
+                entry = measure(func, repeat=repeat, warmup=warmup, memory=True)
+                entry.update({
+                    "key": f"{backend}/{name}/{nrow}x{ncol}",
+                    "backend": backend,
+                    "name": name,
+                    "nrow": nrow,
+                    "ncol": ncol,
+                })
+                results.append(entry)
+    return results
+
+
+def report(results):
+    print(f"{'key':<27} {'median ms':>10} {'iqr ms':>8} {'peak KiB':>9}")
+    for entry in results:
+        print(
+            f"{entry['key']:<27} {entry['median_ns'] / 1e6:>10.3f}"
+            f" {entry['iqr_ns'] / 1e6:>8.3f} {entry['peak_bytes'] / 1024:>9.1f}"
+        )
+
+
+def test_run_smoke():
+    results = run(sizes=[(5, 3)], repeat=2, warmup=0)
+    assert len(results) == len(BACKENDS) * 3
+    assert "cat/filter_eq/5x3" in {r["key"] for r in results}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="flag regressions against this file")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args()
+
+    results = run(repeat=args.repeat)
+    report(results)
+    if args.json:
+        save(results, args.json)
+    if args.baseline:
+        regressions = compare(results, load(args.baseline), args.threshold)
+        for key, old, new, ratio in regressions:
+            print(f"REGRESSION {key}: {old / 1e6:.3f} ms -> {new / 1e6:.3f} ms ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
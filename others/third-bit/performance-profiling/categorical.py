@@ -0,0 +1,111 @@
+from array import array
+from operator import itemgetter
+import sys
+
+
+def _typecode(size):
+    if size <= 2 ** 8:
+        return "B"
+    if size <= 2 ** 16:
+        return "H"
+    return "I"
+
+
+class Categorical:
+    """Column stored as small integer codes into a dictionary of values"""
+
+    def __init__(self, values):
+        lookup = {}
+        codes = [lookup.setdefault(v, len(lookup)) for v in values]
+        self._categories = list(lookup.keys())
+        self._lookup = lookup
+        self._codes = array(_typecode(len(lookup)), codes)
+
+    @classmethod
+    def _from_codes(cls, categories, lookup, codes):
+        column = cls.__new__(cls)
+        column._categories = categories
+        column._lookup = lookup
+        column._codes = codes
+        return column
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __getitem__(self, i):
+        return self._categories[self._codes[i]]
+
+    def __iter__(self):
+        categories = self._categories
+        return (categories[c] for c in self._codes)
+
+    def categories(self):
+        return list(self._categories)
+
+    def codes(self):
+        return self._codes
+
+    def code_of(self, value):
+        return self._lookup.get(value)
+
+    def take(self, rows):
+        codes = self._codes
+        if len(rows) > 1:
+            taken = array(codes.typecode, itemgetter(*rows)(codes))
+        else:
+            taken = array(codes.typecode, [codes[i] for i in rows])
+        return self._from_codes(self._categories, self._lookup, taken)
+
+    def rows_equal(self, value):
+        code = self.code_of(value)
+        if code is None:
+            return []
+        if self._codes.typecode != "B":
+            return [i for i, c in enumerate(self._codes) if c == code]
+        # one byte per code, so bytes.find can scan in C
+        raw, rows = self._codes.tobytes(), []
+        i = raw.find(code)
+        while i != -1:
+            rows.append(i)
+            i = raw.find(code, i + 1)
+        return rows
+
+    def nbytes(self):
+        return (
+            sys.getsizeof(self._codes)
+            + sys.getsizeof(self._categories)
+            + sys.getsizeof(self._lookup)
+            + sum(sys.getsizeof(v) for v in self._categories)
+        )
+
+
+def nbytes(values):
+    """Approximate memory held by a column, including its values"""
+    if isinstance(values, Categorical):
+        return values.nbytes()
+    if isinstance(values, array):
+        return sys.getsizeof(values)
+    return sys.getsizeof(values) + sum(sys.getsizeof(v) for v in values)
+
+
+def test_round_trip():
+    values = ["x", "y", "x", "z", "y"]
+    column = Categorical(values)
+    assert list(column) == values
+    assert column.categories() == ["x", "y", "z"]
+    assert list(column.codes()) == [0, 1, 0, 2, 1]
+    assert column[3] == "z"
+
+
+def test_take_and_rows_equal():
+    column = Categorical([3, 1, 3, 3, 2])
+    assert column.rows_equal(3) == [0, 2, 3]
+    assert column.rows_equal(9) == []
+    assert list(column.take([4, 0])) == [2, 3]
+    assert list(column.take([1])) == [1]
+    assert list(column.take([])) == []
+
+
+def test_uses_less_memory():
+    values = [i % 10 for i in range(1000)]
+    assert nbytes(Categorical(values)) * 4 < nbytes(values)
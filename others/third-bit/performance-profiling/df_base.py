@@ -8,6 +8,9 @@ class DataFrame:
     def cols(self):
         """Return the set of column names"""
 
+    def schema(self):
+        """Return the column names and their types"""
+
     def eq(self, other):
         """Check equality with other dataframe"""
 
@@ -19,3 +22,9 @@ class DataFrame:
 
     def filter(self, func):
         """Select a subset of rows by testing values"""
+
+    def filter_eq(self, col, value):
+        """Select the rows whose value in col equals value"""
+
+    def take(self, rows):
+        """Select a subset of rows by position"""
@@ -1,15 +1,26 @@
+from categorical import Categorical, nbytes
 from df_base import DataFrame
+from schema import Schema
 from util import all_eq
 
 
 class DfCol(DataFrame):
     def __init__(self, **kwargs):
         assert len(kwargs) > 0
-        assert all_eq(len(kwargs[k]) for k in kwargs)
+        assert all_eq(*(len(kwargs[k]) for k in kwargs))
         for k in kwargs:
-            assert all_eq(type(val) for val in kwargs[k])
+            assert all_eq(*(type(val) for val in kwargs[k]))
         self._data = kwargs
-    
+        self._schema = Schema.of_cols(kwargs)
+
+    @classmethod
+    def _trusted(cls, data, schema):
+        """Wrap columns derived from a validated frame without re-checking"""
+        df = cls.__new__(cls)
+        df._data = data
+        df._schema = schema
+        return df
+
     def ncol(self):
         return len(self._data)
     
@@ -20,6 +31,9 @@ class DfCol(DataFrame):
     def cols(self):
         return set(self._data.keys())
 
+    def schema(self):
+        return self._schema
+
     def get(self, col, row):
         assert col in self._data
         assert 0 <= row < len(self._data[col])
@@ -37,16 +51,46 @@ class DfCol(DataFrame):
 
     def select(self, *names):
         assert all(col in self._data for col in names)
-        return DfCol(**{col: self._data[col] for col in names})
+        return self._trusted(
+            {col: self._data[col] for col in names},
+            self._schema.select(*names),
+        )
 
     def filter(self, func):
-        result = {col: [] for col in self._data}
-        for i in range(self.nrow()):
-            kwargs = {col: self._data[col][i] for col in self._data}
-            if func(**kwargs):
-                for col in self._data:
-                    result[col].append(self._data[col][i])
-        return DfCol(**result)
+        rows = [
+            i for i in range(self.nrow())
+            if func(**{col: self._data[col][i] for col in self._data})
+        ]
+        return self.take(rows)
+
+    def filter_eq(self, col, value):
+        assert col in self._data
+        values = self._data[col]
+        if isinstance(values, Categorical):
+            return self.take(values.rows_equal(value))
+        return self.take([i for i, v in enumerate(values) if v == value])
+
+    def take(self, rows):
+        result = {col: _take(self._data[col], rows) for col in self._data}
+        return self._trusted(result, self._schema)
+
+    def categorize(self, *names):
+        """Dictionary-encode the named columns"""
+        assert all(col in self._data for col in names)
+        result = {
+            col: Categorical(values) if col in names else values
+            for col, values in self._data.items()
+        }
+        return self._trusted(result, self._schema)
+
+    def memory_usage(self):
+        return {col: nbytes(values) for col, values in self._data.items()}
+
+
+def _take(values, rows):
+    if isinstance(values, Categorical):
+        return values.take(rows)
+    return [values[i] for i in rows]
 
 
 def test_construct_with_two_pairs():
@@ -65,6 +109,31 @@ def test_filter():
     assert df.filter(odd).eq(DfCol(a=[1], b=[3]))
 
 
+def test_mixed_types_rejected():
+    try:
+        DfCol(a=[1, "2"])
+    except AssertionError:
+        return
+    assert False, "should have had exception"
+
+
+def test_derived_frames_keep_schema():
+    df = DfCol(a=[1, 2], b=["x", "y"])
+    assert df.select("b").schema() == Schema({"b": str})
+    empty = df.filter(lambda a, b: False)
+    assert empty.nrow() == 0
+    assert empty.schema() == df.schema()
+
+
+def test_categorical_columns():
+    df = DfCol(a=[1, 2, 1, 3], b=["x", "y", "x", "x"])
+    cat = df.categorize("b")
+    assert cat.eq(df)
+    assert cat.filter_eq("b", "x").eq(DfCol(a=[1, 1, 3], b=["x", "x", "x"]))
+    assert cat.filter(lambda a, b: a > 1).eq(DfCol(a=[2, 3], b=["y", "x"]))
+    assert cat.memory_usage()["a"] == df.memory_usage()["a"]
+
+
 def test():
     for k, obj in globals().items():
         if k.startswith("test_"):
@@ -0,0 +1,136 @@
+"""Evaluate filters and aggregations across a process pool. Column data
+is copied once into shared memory, so workers only receive a row range
+and send back the positions (or partial sums) they found."""
+
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from df_col import DfCol
+from df_reader import TYPECODES
+from df_row import DfRow
+
+
+def partitions(nrow, count):
+    """Split range(nrow) into at most count contiguous (start, stop) ranges"""
+    size, extra = divmod(nrow, count)
+    result, start = [], 0
+    for i in range(count):
+        stop = start + size + (1 if i < extra else 0)
+        if stop > start:
+            result.append((start, stop))
+        start = stop
+    return result
+
+
+class SharedFrame:
+    def __init__(self, df, workers):
+        schema = df.schema()
+        assert all(schema.type_of(col) in TYPECODES for col in schema.names())
+        self._df = df
+        self._nrow = df.nrow()
+        self._workers = workers
+        self._layout = []
+        offset = 0
+        for col in schema.names():
+            code = TYPECODES[schema.type_of(col)]
+            self._layout.append((col, code, offset))
+            offset += self._nrow * array(code).itemsize
+        self._shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for col, code, start in self._layout:
+            values = array(code, (df.get(col, i) for i in range(self._nrow)))
+            raw = values.tobytes()
+            self._shm.buf[start:start + len(raw)] = raw
+        self._pool = ProcessPoolExecutor(workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._pool.shutdown()
+        self._shm.close()
+        self._shm.unlink()
+
+    def filter(self, func):
+        rows = []
+        for found in self._map(_filter_range, func):
+            rows.extend(found)
+        return self._df.take(rows)
+
+    def sum(self, col, func=None):
+        return sum(self._map(_sum_range, col, func))
+
+    def _map(self, task, *args):
+        ranges = partitions(self._nrow, self._workers)
+        futures = [
+            self._pool.submit(
+                task, self._shm.name, self._nrow, self._layout, start, stop, *args
+            )
+            for start, stop in ranges
+        ]
+        return [f.result() for f in futures]
+
+
+def _attach(name, nrow, layout):
+    shm = shared_memory.SharedMemory(name=name)
+    views = {}
+    for col, code, start in layout:
+        size = nrow * array(code).itemsize
+        views[col] = shm.buf[start:start + size].cast(code)
+    return shm, views
+
+
+def _detach(shm, views):
+    for view in views.values():
+        view.release()
+    shm.close()
+
+
+def _filter_range(name, nrow, layout, start, stop, func):
+    shm, views = _attach(name, nrow, layout)
+    try:
+        return [
+            i for i in range(start, stop)
+            if func(**{col: view[i] for col, view in views.items()})
+        ]
+    finally:
+        _detach(shm, views)
+
+
+def _sum_range(name, nrow, layout, start, stop, col, func):
+    shm, views = _attach(name, nrow, layout)
+    try:
+        if func is None:
+            return sum(views[col][start:stop])
+        return sum(
+            views[col][i] for i in range(start, stop)
+            if func(**{c: view[i] for c, view in views.items()})
+        )
+    finally:
+        _detach(shm, views)
+
+
+def odd(a, b):
+    return (a % 2) == 1
+
+
+def test_partitions():
+    assert partitions(10, 3) == [(0, 4), (4, 7), (7, 10)]
+    assert partitions(2, 4) == [(0, 1), (1, 2)]
+
+
+def test_parallel_filter_matches_serial():
+    df = DfCol(a=list(range(50)), b=[float(i) for i in range(50)])
+    with SharedFrame(df, 3) as shared:
+        assert shared.filter(odd).eq(df.filter(odd))
+        assert shared.filter(odd).nrow() == 25
+
+
+def test_parallel_sum():
+    df = DfRow([{"a": i, "b": 2 * i} for i in range(20)])
+    with SharedFrame(df, 2) as shared:
+        assert shared.sum("b") == sum(2 * i for i in range(20))
+        assert shared.sum("a", odd) == sum(range(1, 20, 2))
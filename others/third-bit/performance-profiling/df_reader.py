@@ -0,0 +1,153 @@
+"""Read frames from disk in fixed-size row chunks so that filter/select
+can run over datasets larger than memory."""
+
+from array import array
+import csv
+import json
+import struct
+
+from df_col import DfCol
+from schema import Schema
+
+CHUNK_ROWS = 10_000
+
+MAGIC = b"DFC1"
+HEADER_LEN = struct.Struct("<I")
+TYPECODES = {int: "q", float: "d"}
+TYPES = {code: kind for kind, code in TYPECODES.items()}
+CONVERT = {int: int, float: float, str: str}
+
+
+def write_csv(df, filename):
+    names = df.schema().names()
+    with open(filename, "w", newline="") as writer:
+        out = csv.writer(writer)
+        out.writerow(names)
+        for i in range(df.nrow()):
+            out.writerow([df.get(col, i) for col in names])
+
+
+def read_csv(filename, schema, chunk_rows=CHUNK_ROWS):
+    names = schema.names()
+    convert = [CONVERT[schema.type_of(col)] for col in names]
+    with open(filename, "r", newline="") as reader:
+        rows = csv.reader(reader)
+        assert next(rows) == names, f"Header of {filename} does not match schema"
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_rows:
+                yield _csv_chunk(names, convert, chunk, schema)
+                chunk = []
+        if chunk:
+            yield _csv_chunk(names, convert, chunk, schema)
+
+
+def _csv_chunk(names, convert, rows, schema):
+    data = {
+        col: [conv(row[i]) for row in rows]
+        for i, (col, conv) in enumerate(zip(names, convert))
+    }
+    return DfCol._trusted(data, schema)
+
+
+def write_binary(df, filename):
+    """Store each column contiguously after a small JSON header"""
+    schema = df.schema()
+    names = schema.names()
+    assert all(schema.type_of(col) in TYPECODES for col in names)
+    header = json.dumps({
+        "nrow": df.nrow(),
+        "cols": [[col, TYPECODES[schema.type_of(col)]] for col in names],
+    }).encode("utf-8")
+    with open(filename, "wb") as writer:
+        writer.write(MAGIC)
+        writer.write(HEADER_LEN.pack(len(header)))
+        writer.write(header)
+        for col in names:
+            values = array(TYPECODES[schema.type_of(col)])
+            values.extend(df.get(col, i) for i in range(df.nrow()))
+            values.tofile(writer)
+
+
+def read_binary(filename, chunk_rows=CHUNK_ROWS):
+    with open(filename, "rb") as reader:
+        assert reader.read(len(MAGIC)) == MAGIC, f"{filename} is not a frame"
+        (size,) = HEADER_LEN.unpack(reader.read(HEADER_LEN.size))
+        header = json.loads(reader.read(size))
+        start = reader.tell()
+        nrow = header["nrow"]
+        schema = Schema({col: TYPES[code] for col, code in header["cols"]})
+
+        offsets = {}
+        for col, code in header["cols"]:
+            offsets[col] = start
+            start += nrow * array(code).itemsize
+
+        for first in range(0, nrow, chunk_rows):
+            count = min(chunk_rows, nrow - first)
+            data = {}
+            for col, code in header["cols"]:
+                values = array(code)
+                reader.seek(offsets[col] + first * values.itemsize)
+                values.fromfile(reader, count)
+                data[col] = values
+            yield DfCol._trusted(data, schema)
+
+
+def filter_chunks(chunks, func):
+    for chunk in chunks:
+        yield chunk.filter(func)
+
+
+def select_chunks(chunks, *names):
+    for chunk in chunks:
+        yield chunk.select(*names)
+
+
+def concat(chunks):
+    """Gather chunks into one in-memory frame (for small results)"""
+    data, schema = None, None
+    for chunk in chunks:
+        if data is None:
+            schema = chunk.schema()
+            data = {col: [] for col in schema.names()}
+        for col in data:
+            data[col].extend(chunk.get(col, i) for i in range(chunk.nrow()))
+    assert data is not None, "No chunks to concatenate"
+    return DfCol._trusted(data, schema)
+
+
+def sample():
+    return DfCol(a=list(range(25)), b=[float(i) / 2 for i in range(25)])
+
+
+def odd(a, b):
+    return (a % 2) == 1
+
+
+def test_csv_round_trip_in_chunks(tmp_path):
+    df = sample()
+    filename = tmp_path / "sample.csv"
+    write_csv(df, filename)
+    chunks = list(read_csv(filename, df.schema(), chunk_rows=10))
+    assert [c.nrow() for c in chunks] == [10, 10, 5]
+    assert concat(chunks).eq(df)
+
+
+def test_binary_round_trip_in_chunks(tmp_path):
+    df = sample()
+    filename = tmp_path / "sample.dfc"
+    write_binary(df, filename)
+    chunks = list(read_binary(filename, chunk_rows=7))
+    assert [c.nrow() for c in chunks] == [7, 7, 7, 4]
+    assert chunks[0].schema() == df.schema()
+    assert concat(chunks).eq(df)
+
+
+def test_filter_select_chunk_by_chunk(tmp_path):
+    df = sample()
+    filename = tmp_path / "sample.dfc"
+    write_binary(df, filename)
+    chunks = select_chunks(filter_chunks(read_binary(filename, 4), odd), "b")
+    assert concat(chunks).eq(df.filter(odd).select("b"))
@@ -1,4 +1,5 @@
 from df_base import DataFrame
+from schema import Schema
 from util import dict_match
 
 
@@ -7,18 +8,30 @@ class DfRow(DataFrame):
         assert len(rows) > 0
         assert all(dict_match(r, rows[0]) for r in rows)
         self._data = rows
+        self._schema = Schema.of_row(rows[0])
+
+    @classmethod
+    def _trusted(cls, rows, schema):
+        """Wrap rows derived from a validated frame without re-checking"""
+        df = cls.__new__(cls)
+        df._data = rows
+        df._schema = schema
+        return df
 
     def ncol(self):
-        return len(self._data[0])
+        return len(self._schema)
 
     def nrow(self):
         return len(self._data)
 
     def cols(self):
-        return set(self._data[0].keys())
+        return self._schema.cols()
+
+    def schema(self):
+        return self._schema
 
     def get(self, col, row):
-        assert col in self._data[0]
+        assert col in self._schema
         assert 0 <= row < len(self._data)
         return self._data[row][col]
     
@@ -33,14 +46,21 @@ class DfRow(DataFrame):
         return True
 
     def select(self, *names):
-        assert all(n in self._data[0] for n in names)
+        assert all(n in self._schema for n in names)
         rows = [{k: row[k] for k in names} for row in self._data]
-        return DfRow(rows)
+        return self._trusted(rows, self._schema.select(*names))
     
     def filter(self, func):
         result = [r for r in self._data if func(**r)]
-        return DfRow(result)
+        return self._trusted(result, self._schema)
 
+    def filter_eq(self, col, value):
+        assert col in self._schema
+        result = [r for r in self._data if r[col] == value]
+        return self._trusted(result, self._schema)
+
+    def take(self, rows):
+        return self._trusted([self._data[i] for i in rows], self._schema)
 
 
 def odd_even():
@@ -54,5 +74,18 @@ def test_filter():
     df = odd_even()
     assert df.filter(odd).eq(DfRow([{"a": 1, "b": 3}]))
 
+
+def test_filter_to_empty():
+    df = odd_even().filter(lambda a, b: a > 10)
+    assert df.nrow() == 0
+    assert df.cols() == {"a", "b"}
+
+
+def test():
+    for k, obj in globals().items():
+        if k.startswith("test_"):
+            obj()
+
+
 if __name__ == '__main__':
-    test_filter()
+    test()
@@ -0,0 +1,110 @@
+"""Repeated timing with warmup, summarised by median and IQR, plus
+helpers to store results as JSON and compare them against a baseline."""
+
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+
+WARMUP = 1
+REPEAT = 7
+THRESHOLD = 0.10
+
+
+def measure(func, repeat=REPEAT, warmup=WARMUP, memory=False):
+    for _ in range(warmup):
+        func()
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        func()
+        runs.append(time.perf_counter_ns() - start)
+    result = summarize(runs)
+    if memory:
+        result["peak_bytes"] = peak_memory(func)
+    return result
+
+
+def summarize(runs):
+    if len(runs) > 1:
+        q1, median, q3 = statistics.quantiles(runs, n=4, method="inclusive")
+    else:
+        q1 = median = q3 = runs[0]
+    return {
+        "runs": len(runs),
+        "min_ns": min(runs),
+        "median_ns": median,
+        "q1_ns": q1,
+        "q3_ns": q3,
+        "iqr_ns": q3 - q1,
+    }
+
+
+def peak_memory(func):
+    """Peak bytes allocated by one call (traced separately from timing)"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def save(results, filename):
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "time": int(time.time()),
+        },
+        "results": results,
+    }
+    with open(filename, "w") as writer:
+        json.dump(report, writer, indent=2)
+
+
+def load(filename):
+    with open(filename, "r") as reader:
+        return json.load(reader)["results"]
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """Report entries whose median grew by more than threshold and by
+    more than the baseline's own spread"""
+    known = {entry["key"]: entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        if entry["key"] not in known:
+            continue
+        old = known[entry["key"]]
+        slower = entry["median_ns"] - old["median_ns"]
+        if (slower > old["median_ns"] * threshold) and (slower > old["iqr_ns"]):
+            ratio = entry["median_ns"] / old["median_ns"]
+            regressions.append((entry["key"], old["median_ns"], entry["median_ns"], ratio))
+    return regressions
+
+
+def test_measure_counts_runs():
+    calls = []
+    result = measure(lambda: calls.append(1), repeat=5, warmup=2)
+    assert len(calls) == 7
+    assert result["runs"] == 5
+    assert result["q1_ns"] <= result["median_ns"] <= result["q3_ns"]
+
+
+def test_peak_memory():
+    assert peak_memory(lambda: bytearray(1_000_000)) >= 1_000_000
+
+
+def test_compare_flags_regression():
+    baseline = [
+        {"key": "a", "median_ns": 100, "iqr_ns": 5},
+        {"key": "b", "median_ns": 100, "iqr_ns": 50},
+    ]
+    results = [
+        {"key": "a", "median_ns": 130, "iqr_ns": 5},
+        {"key": "b", "median_ns": 130, "iqr_ns": 5},
+        {"key": "c", "median_ns": 999, "iqr_ns": 5},
+    ]
+    assert [r[0] for r in compare(results, baseline)] == ["a"]
@@ -0,0 +1,50 @@
+class Schema:
+    """Column names and the type of the values held in each column"""
+
+    def __init__(self, types):
+        self._types = dict(types)
+
+    @classmethod
+    def of_cols(cls, cols):
+        return cls({k: type(v[0]) if len(v) else None for k, v in cols.items()})
+
+    @classmethod
+    def of_row(cls, row):
+        return cls({k: type(v) for k, v in row.items()})
+
+    def __len__(self):
+        return len(self._types)
+
+    def __contains__(self, col):
+        return col in self._types
+
+    def __eq__(self, other):
+        return isinstance(other, Schema) and self._types == other._types
+
+    def __repr__(self):
+        return f"Schema({self._types})"
+
+    def cols(self):
+        return set(self._types.keys())
+
+    def names(self):
+        return list(self._types.keys())
+
+    def type_of(self, col):
+        return self._types[col]
+
+    def select(self, *names):
+        assert all(n in self._types for n in names)
+        return Schema({n: self._types[n] for n in names})
+
+
+def test_of_cols():
+    schema = Schema.of_cols({"a": [1, 2], "b": ["x", "y"]})
+    assert schema.type_of("a") is int
+    assert schema.type_of("b") is str
+    assert schema.cols() == {"a", "b"}
+
+
+def test_select():
+    schema = Schema.of_row({"a": 1, "b": "x", "c": 2.0})
+    assert schema.select("c", "a") == Schema({"c": float, "a": int})
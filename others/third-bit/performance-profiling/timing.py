@@ -1,17 +1,18 @@
-import time
-
 from df_col import DfCol
+from df_parallel import SharedFrame
 from df_row import DfRow
+from harness import measure
 
 RANGE = 10
 
 
 
-def make_col(nrow, ncol):
+def make_col(nrow, ncol, categorical=False):
     def _col(n, start):
         return [((start + i) % RANGE) for i in range(n)]
     fill = {f"label_{c}": _col(nrow, c) for c in range(ncol)}
-    return DfCol(**fill)
+    df = DfCol(**fill)
+    return df.categorize(*fill.keys()) if categorical else df
 
 def make_row(nrow, ncol):
     labels = [f"label_{c}" for c in range(ncol)]
@@ -26,24 +27,40 @@ def make_row(nrow, ncol):
 FILTER = 2
 
 
-def time_filter(df):
-    def f(label_0, **args):
-        return label_0 % FILTER == 1
-    start = time.time()
-    df.filter(f)
-    return time.time() - start
+def filter_label_0(label_0, **args):
+    return label_0 % FILTER == 1
+
+
+def time_filter(df, repeat=3):
+    """Median seconds per filter call"""
+    result = measure(lambda: df.filter(filter_label_0), repeat=repeat)
+    return result["median_ns"] / 1e9
 
 SELECT = 3
 
-def time_select(df):
+def select_labels(df):
     indices = [i for i in range(df.ncol()) if ((i % SELECT) == 0)]
-    labels = [f"label_{i}" for i in indices]
-    start = time.time()
-    df.select(*labels)
-    return time.time() - start
+    return [f"label_{i}" for i in indices]
+
+
+def time_select(df, repeat=3):
+    """Median seconds per select call"""
+    labels = select_labels(df)
+    result = measure(lambda: df.select(*labels), repeat=repeat)
+    return result["median_ns"] / 1e9
+
+
+def speedup(df, cores):
+    """Serial filter time divided by the filter time on each core count"""
+    serial = time_filter(df)
+    result = []
+    for n in cores:
+        with SharedFrame(df, n) as shared:
+            result.append(serial / max(time_filter(shared), 1e-9))
+    return result
 
 
-def sweep(sizes):
+def sweep(sizes, cores=()):
     result = []
     for (nrow, ncol) in sizes:
         df_col = make_col(nrow, ncol)
@@ -54,13 +71,13 @@ def sweep(sizes):
             time_filter(df_row),
             time_select(df_row),
         ]
-        result.append([nrow, ncol, *times])
+        result.append([nrow, ncol, *times, *speedup(df_col, cores)])
     return result
 
 
 def test():
     sizes = [(10, 10), (50, 50), (100, 100), (500, 500), (1000, 1000)]
-    result = sweep(sizes)
+    result = sweep(sizes, cores=[1, 2, 4])
     from pprint import pprint
     pprint(result)
 
@@ -0,0 +1,67 @@
+"""Compare filter/select when derived frames are re-validated (before)
+against the trusted construction path (after)."""
+
+from df_col import DfCol
+from df_row import DfRow
+from timing import make_col, make_row, time_filter, time_select
+
+
+class CheckedCol(DfCol):
+    @classmethod
+    def _trusted(cls, data, schema):
+        return cls(**data)
+
+
+class CheckedRow(DfRow):
+    @classmethod
+    def _trusted(cls, rows, schema):
+        return cls(rows)
+
+
+def checked(df, cls):
+    checked_df = cls.__new__(cls)
+    checked_df.__dict__.update(df.__dict__)
+    return checked_df
+
+
+def sweep(sizes):
+    result = []
+    for (nrow, ncol) in sizes:
+        df_col = make_col(nrow, ncol)
+        df_row = make_row(nrow, ncol)
+        before_col = checked(df_col, CheckedCol)
+        before_row = checked(df_row, CheckedRow)
+        times = [
+            time_filter(before_col),
+            time_filter(df_col),
+            time_select(before_col),
+            time_select(df_col),
+            time_filter(before_row),
+            time_filter(df_row),
+            time_select(before_row),
+            time_select(df_row),
+        ]
+        result.append([nrow, ncol, *times])
+    return result
+
+
+def test_checked_matches_trusted():
+    df = make_col(20, 6)
+    before = checked(df, CheckedCol)
+    assert before.select("label_0", "label_3").eq(df.select("label_0", "label_3"))
+    assert isinstance(before.select("label_0"), CheckedCol)
+
+
+def main():
+    sizes = [(10, 10), (50, 50), (100, 100), (500, 500), (1000, 1000)]
+    print("nrow ncol | col filter before/after | col select before/after"
+          " | row filter before/after | row select before/after")
+    for nrow, ncol, *times in sweep(sizes):
+        cells = " | ".join(
+            f"{times[i]:.4f}/{times[i + 1]:.4f}" for i in range(0, len(times), 2)
+        )
+        print(f"{nrow} {ncol} | {cells}")
+
+
+if __name__ == '__main__':
+    main()
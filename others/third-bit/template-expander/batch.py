@@ -0,0 +1,140 @@
+"""Render one template against many variable sets in a process pool.
+
+    batch.py template.ht (vars_dir | vars.jsonl) out_dir [workers]
+
+A directory holds one JSON file per page and each produces a file of
+the same stem in out_dir; a JSON-lines file produces 000000.html,
+000001.html and so on, one per line.
+"""
+
+import json
+import os
+import sys
+from multiprocessing import Pool
+
+import compiler
+
+JOBS_PER_TASK = 32
+
+_code = None
+_out_dir = None
+
+
+def jobs(source):
+    """Yield (output name, kind, payload) without reading everything first"""
+    if os.path.isdir(source):
+        for entry in sorted(os.scandir(source), key=lambda e: e.name):
+            stem, ext = os.path.splitext(entry.name)
+            if ext == ".json" and entry.is_file():
+                yield f"{stem}.html", "path", entry.path
+    else:
+        with open(source) as reader:
+            for i, line in enumerate(reader):
+                if line.strip():
+                    yield f"{i:06d}.html", "line", line
+
+
+def _start(code, out_dir):
+    global _code, _out_dir
+    _code, _out_dir = code, out_dir
+
+
+def _render(job):
+    name, kind, payload = job
+    if kind == "path":
+        with open(payload) as reader:
+            variables = json.load(reader)
+    else:
+        variables = json.loads(payload)
+    path = os.path.join(_out_dir, name)
+    with open(path, "w") as writer:
+        compiler.render_to(_code, variables, writer)
+    return name, os.path.getsize(path)
+
+
+def render_all(template, source, out_dir, workers=None):
+    """Compile template once, render every job, return {name: bytes}"""
+    code = compiler.load(template)
+    os.makedirs(out_dir, exist_ok=True)
+    if workers == 1:
+        _start(code, out_dir)
+        return dict(map(_render, jobs(source)))
+    with Pool(workers, initializer=_start, initargs=(code, out_dir)) as pool:
+        return dict(
+            pool.imap_unordered(_render, jobs(source), JOBS_PER_TASK)
+        )
+
+
+def main():
+    args = sys.argv[1:]
+    valid = len(args) == 3 or (len(args) == 4 and args[3].isdigit() and int(args[3]) > 0)
+    if not valid:
+        print("Usage: batch.py <template.ht> <vars_dir | vars.jsonl> <out_dir> [workers]")
+        sys.exit(1)
+
+    template, source, out_dir = args[:3]
+    workers = int(args[3]) if len(args) == 4 else None
+    written = render_all(template, source, out_dir, workers)
+    print(f"{len(written)} pages, {sum(written.values())} bytes")
+
+
+TEST_TEMPLATE = """<html>
+  <h1><span z-var="title"/></h1>
+  <ul z-loop="item:names"><li><span z-var="item"/></li></ul>
+</html>"""
+
+
+def make_batch(tmp_path, count=5):
+    template = tmp_path / "page.ht"
+    template.write_text(TEST_TEMPLATE)
+    sets = [{"title": f"page {i}", "names": [str(j) for j in range(i)]}
+            for i in range(count)]
+    lines = tmp_path / "vars.jsonl"
+    lines.write_text("".join(json.dumps(v) + "\n" for v in sets))
+    return str(template), str(lines), sets
+
+
+def test_jobs_from_directory(tmp_path):
+    (tmp_path / "b.json").write_text("{}")
+    (tmp_path / "a.json").write_text("{}")
+    (tmp_path / "notes.txt").write_text("not a page")
+    (tmp_path / "sub.json").mkdir()
+    assert list(jobs(str(tmp_path))) == [
+        ("a.html", "path", str(tmp_path / "a.json")),
+        ("b.html", "path", str(tmp_path / "b.json")),
+    ]
+
+
+def test_jobs_from_json_lines_skip_blank_lines(tmp_path):
+    source = tmp_path / "vars.jsonl"
+    source.write_text('{"a": 1}\n\n  \n{"a": 2}\n')
+    assert list(jobs(str(source))) == [
+        ("000000.html", "line", '{"a": 1}\n'),
+        ("000003.html", "line", '{"a": 2}\n'),
+    ]
+
+
+def test_render_in_process_matches_compiler(tmp_path):
+    template, lines, sets = make_batch(tmp_path)
+    out_dir = tmp_path / "out"
+    written = render_all(template, lines, str(out_dir), workers=1)
+    code = compiler.load(template)
+    assert sorted(written) == [f"{i:06d}.html" for i in range(len(sets))]
+    for i, variables in enumerate(sets):
+        page = (out_dir / f"{i:06d}.html").read_text()
+        assert page == compiler.render(code, variables)
+        assert written[f"{i:06d}.html"] == len(page.encode())
+
+
+def test_pool_matches_in_process(tmp_path):
+    template, lines, sets = make_batch(tmp_path, count=40)
+    serial, pooled = tmp_path / "serial", tmp_path / "pooled"
+    assert render_all(template, lines, str(serial), workers=1) == render_all(
+        template, lines, str(pooled), workers=2
+    )
+    for path in serial.iterdir():
+        assert (pooled / path.name).read_text() == path.read_text()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Render one template against many variable sets: parsing and walking
+every time, walking a tree parsed once, and running compiled code."""
+
+import os
+import sys
+import tempfile
+import time
+
+import compiler
+from expander import Expander, load_template
+
+TEMPLATE = """<html>
+  <body>
+    <h1><span z-var="title"/></h1>
+    <ul z-loop="item:names">
+      <li><span z-var="item"/> of <span z-var="title"/></li>
+    </ul>
+    <p z-if="footer">Footer <em>text</em></p>
+  </body>
+</html>"""
+
+
+def variable_sets(count, items):
+    return [
+        {
+            "title": f"page {i}",
+            "names": [f"name {j}" for j in range(items)],
+            "footer": i % 2 == 0,
+        }
+        for i in range(count)
+    ]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def walk(template, variables):
+    expander = Expander(template, variables)
+    expander.walk()
+    return expander.get_result()
+
+
+def main(count=1000, items=20):
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "page.ht")
+        with open(path, "w") as writer:
+            writer.write(TEMPLATE)
+        sets = variable_sets(count, items)
+
+        parse_time, parsed = timed(
+            lambda: [walk(load_template(path), v) for v in sets]
+        )
+        template = load_template(path)
+        walk_time, walked = timed(lambda: [walk(template, v) for v in sets])
+        compiled_time, compiled = timed(
+            lambda: [compiler.render(compiler.load(path), v) for v in sets]
+        )
+    assert parsed == walked == compiled
+    print(f"{count} renders, {items} loop items each")
+    print(f"parse + walk each time: {parse_time:.3f}s")
+    print(f"walk pre-parsed tree:   {walk_time:.3f}s")
+    print(f"compiled (cached):      {compiled_time:.3f}s")
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
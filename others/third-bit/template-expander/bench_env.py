@@ -0,0 +1,103 @@
+"""Render deeply nested loops with the old copy-and-search scope stack
+and with the current Env, both by walking the tree and as compiled code."""
+
+import os
+import sys
+import tempfile
+import time
+
+import compiler
+import expander
+from expander import Expander, load_template
+
+TEMPLATE = """<html>
+  <body>
+    <h1><span z-var="title"/></h1>
+    <div z-loop="group:groups">
+      <h2><span z-var="title"/></h2>
+      <ul z-loop="row:group">
+        <li z-loop="cell:row"><span z-var="cell"/> in <span z-var="title"/></li>
+      </ul>
+    </div>
+  </body>
+</html>"""
+
+
+class StackEnv:
+    """The original scope: copy each frame, search frames innermost first"""
+
+    def __init__(self, initial):
+        self.stack = [initial.copy()]
+
+    def push(self, frame):
+        self.stack.append(frame.copy())
+
+    def pop(self):
+        return self.stack.pop()
+
+    def set(self, name, value):
+        self.stack[-1][name] = value
+
+    def find(self, name):
+        for frame in reversed(self.stack):
+            if name in frame:
+                return frame[name]
+        return None
+
+
+def variables(groups, rows, cells):
+    return {
+        "title": "nested",
+        "groups": [
+            [[f"{g}.{r}.{c}" for c in range(cells)] for r in range(rows)]
+            for g in range(groups)
+        ],
+    }
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def walk(template, values, env_class):
+    original = expander.Env
+    expander.Env = env_class
+    try:
+        walker = Expander(template, values)
+    finally:
+        expander.Env = original
+    walker.walk()
+    return walker.get_result()
+
+
+def run(code, values, env_class):
+    return "".join(compiler._run(code, env_class(values)))
+
+
+def main(groups=20, rows=50, cells=10):
+    values = variables(groups, rows, cells)
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "nested.ht")
+        with open(path, "w") as writer:
+            writer.write(TEMPLATE)
+        template = load_template(path)
+        code = compiler.load(path)
+
+    results = []
+    print(f"{groups} x {rows} x {cells} = {groups * rows * cells} innermost items")
+    for label, func in (
+        ("walk, stack env:    ", lambda: walk(template, values, StackEnv)),
+        ("walk, flat env:     ", lambda: walk(template, values, expander.Env)),
+        ("compiled, stack env:", lambda: run(code, values, StackEnv)),
+        ("compiled, flat env: ", lambda: run(code, values, expander.Env)),
+    ):
+        elapsed, result = timed(func)
+        results.append(result)
+        print(f"{label} {elapsed:.3f}s")
+    assert all(result == results[0] for result in results)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,90 @@
+"""Compare BeautifulSoup and the HTMLParser-based htmltree as template
+front ends: parse time, parse + render time, and memory held by the tree."""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import compiler
+import expander
+import htmltree
+from expander import Expander
+
+
+def make_template(rows):
+    body = "\n".join(
+        f'      <tr><td align="right">{i}</td><td><span z-var="title"/></td>'
+        f'<td><em>row</em> {i}</td></tr>'
+        for i in range(rows)
+    )
+    return f"""<html>
+  <body>
+    <h1><span z-var="title"/></h1>
+    <table>
+{body}
+    </table>
+    <ul z-loop="item:names">
+      <li><span z-var="item"/></li>
+    </ul>
+  </body>
+</html>"""
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def tree_memory(loader, path):
+    tracemalloc.start()
+    tree = loader(path)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+    return size
+
+
+def walk(loader, path, variables):
+    walker = Expander(loader(path), variables)
+    walker.walk()
+    return walker.get_result()
+
+
+def compile_and_render(loader, path, variables):
+    code = compiler.Compiler().compile(loader(path))
+    return compiler.render(code, variables)
+
+
+def main(rows=5000):
+    variables = {"title": "bench", "names": [f"name {i}" for i in range(20)]}
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "big.ht")
+        with open(path, "w") as writer:
+            writer.write(make_template(rows))
+        print(f"{rows} table rows, {os.path.getsize(path)} bytes")
+        results = []
+        for label, loader in (
+            ("BeautifulSoup", expander.load_template),
+            ("htmltree     ", htmltree.load_template),
+        ):
+            parse_time, _ = timed(lambda: loader(path))
+            walk_time, walked = timed(lambda: walk(loader, path, variables))
+            code_time, compiled = timed(
+                lambda: compile_and_render(loader, path, variables)
+            )
+            memory = tree_memory(loader, path)
+            results.extend([walked, compiled])
+            print(
+                f"{label} parse {parse_time:.3f}s"
+                f"  parse+walk {walk_time:.3f}s"
+                f"  parse+compile+render {code_time:.3f}s"
+                f"  tree {memory / 1e6:.1f}MB"
+            )
+    assert all(result == results[0] for result in results)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
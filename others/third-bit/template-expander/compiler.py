@@ -0,0 +1,205 @@
+"""Compile a template once into a flat list of instructions, so that
+rendering it against many sets of variables skips parsing and walking
+the tree. Each handler module provides compile() alongside open/close."""
+
+from contextlib import contextmanager
+import json
+import os
+import sys
+
+from expander import HANDLERS, Env, find_handler, is_text, load_template, tag_text
+
+TEXT, VAR, IF, LOOP = range(4)
+
+
+class Compiler:
+    def __init__(self, handlers=HANDLERS):
+        self.handlers = handlers
+        self.code = []
+        self.pending = []
+
+    def compile(self, node):
+        self._node(node)
+        self._flush()
+        return self.code
+
+    def _node(self, node):
+        if is_text(node):
+            self.text(node.string)
+        elif handler := find_handler(self.handlers, node):
+            handler.compile(self, node)
+        else:
+            self.tag(node)
+            self.children(node)
+            self.tag(node, closing=True)
+
+    def children(self, node):
+        for child in node.children:
+            self._node(child)
+
+    def text(self, text):
+        # joined once by _flush: adding to the last TEXT each time would
+        # copy the whole run of static text for every fragment
+        self.pending.append("UNDEF" if text is None else text)
+
+    def tag(self, node, closing=False):
+        self.text(tag_text(node, closing))
+
+    def var(self, name):
+        self._emit((VAR, name))
+
+    @contextmanager
+    def when(self, name):
+        body = yield from self._block()
+        self._emit((IF, name, body))
+
+    @contextmanager
+    def loop(self, index_name, target):
+        body = yield from self._block()
+        self._emit((LOOP, index_name, target, body))
+
+    def _emit(self, instruction):
+        self._flush()
+        self.code.append(instruction)
+
+    def _flush(self):
+        if self.pending:
+            self.code.append((TEXT, "".join(self.pending)))
+            self.pending = []
+
+    def _block(self):
+        self._flush()
+        outer, self.code = self.code, []
+        try:
+            yield
+            self._flush()
+        finally:
+            self.pending = []
+            body, self.code = self.code, outer
+        return body
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+def render(code, variables):
+    return "".join(_run(code, Env(variables)))
+
+
+def iter_render(code, variables, chunk_size=CHUNK_SIZE):
+    """Yield the output in pieces of roughly chunk_size characters, so
+    only one piece is held in memory at a time"""
+    pending, size = [], 0
+    for text in _run(code, Env(variables)):
+        pending.append(text)
+        size += len(text)
+        if size >= chunk_size:
+            yield "".join(pending)
+            pending, size = [], 0
+    if pending:
+        yield "".join(pending)
+
+
+def render_to(code, variables, writer, chunk_size=CHUNK_SIZE):
+    for chunk in iter_render(code, variables, chunk_size):
+        writer.write(chunk)
+
+
+def _run(code, env):
+    for instruction in code:
+        op = instruction[0]
+        if op == TEXT:
+            yield instruction[1]
+        elif op == VAR:
+            value = env.find(instruction[1])
+            yield "UNDEF" if value is None else value
+        elif op == IF:
+            if env.find(instruction[1]):
+                yield from _run(instruction[2], env)
+        else:
+            _, index_name, target, body = instruction
+            items = env.find(target)
+            env.push({index_name: None})
+            for item in items:
+                env.set(index_name, item)
+                yield from _run(body, env)
+            env.pop()
+
+
+_cache = {}
+
+
+def load(path, handlers=HANDLERS, loader=load_template):
+    """Compiled code for a template file, recompiled when it changes"""
+    path = os.path.abspath(path)
+    mtime = os.stat(path).st_mtime_ns
+    # handler tables are dicts, so key on their id and keep a reference
+    # in the entry so that id cannot be reused by another table
+    key = (path, loader, id(handlers))
+    cached = _cache.get(key)
+    if cached is None or cached[0] != mtime:
+        code = Compiler(handlers).compile(loader(path))
+        cached = _cache[key] = (mtime, handlers, code)
+    return cached[2]
+
+
+def main():
+    with open(sys.argv[1]) as f:
+        variables = json.load(f)
+    render_to(load(sys.argv[2]), variables, sys.stdout)
+    print()
+
+
+def test_adjacent_text_becomes_one_instruction():
+    from bs4 import BeautifulSoup
+    source = (
+        '<html><p>a</p><b z-var="x"/>'
+        '<ul z-loop="i:xs"><li>b</li><li>c</li></ul></html>'
+    )
+    code = Compiler().compile(BeautifulSoup(source, "html.parser").find("html"))
+    assert code == [
+        (TEXT, "<html><p>a</p><b>"),
+        (VAR, "x"),
+        (TEXT, "</b><ul>"),
+        (LOOP, "i", "xs", [(TEXT, "<li>b</li><li>c</li>")]),
+        (TEXT, "</ul></html>"),
+    ]
+
+
+def test_compiled_matches_expander_on_samples():
+    import glob
+    import htmltree
+    from expander import Expander
+    here = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(here, "vars.json")) as reader:
+        variables = json.load(reader)
+    samples = sorted(glob.glob(os.path.join(here, "*.ht")))
+    assert samples
+    for path in samples:
+        for loader in (load_template, htmltree.load_template):
+            expander = Expander(loader(path), variables)
+            expander.walk()
+            expected = expander.get_result()
+            code = load(path, loader=loader)
+            assert render(code, variables) == expected
+            assert "".join(iter_render(code, variables, chunk_size=4)) == expected
+
+
+def test_compiled_nested_loops_with_same_index_name():
+    from bs4 import BeautifulSoup
+    from expander import NESTED, NESTED_RESULT, NESTED_VARS
+    code = Compiler().compile(BeautifulSoup(NESTED, "html.parser").find("html"))
+    assert render(code, NESTED_VARS) == NESTED_RESULT
+
+
+def test_cache_keyed_on_loader_and_handlers():
+    import htmltree
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "loop.ht")
+    code = load(path)
+    assert load(path) is code
+    assert load(path, loader=htmltree.load_template) is not code
+    assert load(path, handlers=dict(HANDLERS)) is not code
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,7 @@ import sys
 
 from bs4 import BeautifulSoup, NavigableString
 
+import htmltree
 import z_var
 import z_num
 import z_if
@@ -16,23 +17,43 @@ HANDLERS = {
     "z-loop": z_loop, 
 }
 
+BUFFER_SIZE = 64 * 1024
+
+
+_MISSING = object()
+
 
 class Env:
+    """Variables in scope, kept in one dict so a lookup is a single probe;
+    push records the values a frame hides and pop puts them back"""
 
     def __init__(self, initial):
-        self.stack = [initial.copy()]
+        self.values = dict(initial)
+        self.saved = []
 
     def push(self, frame):
-        self.stack.append(frame.copy())
+        values = self.values
+        self.saved.append(
+            (frame, [(name, values.get(name, _MISSING)) for name in frame])
+        )
+        values.update(frame)
 
     def pop(self):
-        return self.stack.pop()
+        frame, hidden = self.saved.pop()
+        values = self.values
+        for name, value in hidden:
+            if value is _MISSING:
+                del values[name]
+            else:
+                values[name] = value
+        return frame
+
+    def set(self, name, value):
+        """Rebind a name in the innermost frame without pushing a new one"""
+        self.values[name] = value
 
     def find(self, name):
-        for frame in reversed(self.stack):
-            if name in frame:
-                return frame[name]
-        return None
+        return self.values.get(name)
 
 
 class Visitor:
@@ -59,14 +80,17 @@ class Visitor:
 
 class Expander(Visitor):
 
-    def __init__(self, root, variables):
+    def __init__(self, root, variables, writer=None, buffer_size=BUFFER_SIZE):
         super().__init__(root)
         self.env = Env(variables)
         self.handlers = HANDLERS
         self.result = []
+        self.writer = writer
+        self.buffer_size = buffer_size
+        self.buffered = 0
 
     def open(self, node):
-        if isinstance(node, NavigableString):
+        if is_text(node):
             self.output(node.string)
             return False
         elif handler := self.get_handler(node):
@@ -76,7 +100,7 @@ class Expander(Visitor):
             return True
 
     def close(self, node):
-        if isinstance(node, NavigableString):
+        if is_text(node):
             return
         elif handler := self.get_handler(node):
             handler.close(self, node)
@@ -84,38 +108,108 @@ class Expander(Visitor):
             self.show_tag(node, closing=True)
 
     def get_handler(self, node):
-        possible = [name for name in node.attrs if name in self.handlers]
-        return self.handlers[possible[-1]] if possible else None
+        return find_handler(self.handlers, node)
     
     def show_tag(self, node, closing=False):
-        if closing:
-            self.output(f"</{node.name}>")
-        else:
-            self.output(f"<{node.name}")
-            for attr, value in node.attrs.items():
-                if not attr.startswith("z-"):
-                    self.output(f" {attr}={value}")
-            self.output(">")
+        self.output(tag_text(node, closing))
 
     def output(self, text):
-        self.result.append("UNDEF" if text is None else text)
+        text = "UNDEF" if text is None else text
+        self.result.append(text)
+        if self.writer is not None:
+            self.buffered += len(text)
+            if self.buffered >= self.buffer_size:
+                self.flush()
+
+    def flush(self):
+        """Send buffered output to the writer, if there is one"""
+        if self.writer is not None and self.result:
+            self.writer.write("".join(self.result))
+            self.result = []
+            self.buffered = 0
 
     def get_result(self):
         return "".join(self.result)
 
 
+def is_text(node):
+    return isinstance(node, (NavigableString, htmltree.Text))
+
+
+def find_handler(handlers, node):
+    possible = [name for name in node.attrs if name in handlers]
+    return handlers[possible[-1]] if possible else None
+
+
+def tag_text(node, closing=False):
+    if closing:
+        return f"</{node.name}>"
+    attrs = "".join(
+        f" {attr}={value}"
+        for attr, value in node.attrs.items()
+        if not attr.startswith("z-")
+    )
+    return f"<{node.name}{attrs}>"
+
+
+def load_template(path):
+    with open(path) as f:
+        doc = BeautifulSoup(f.read(), "html.parser")
+    return doc.find("html")
+
 
 def main():
     with open(sys.argv[1]) as f:
         variables = json.load(f)
 
-    with open(sys.argv[2]) as f:
-        doc = BeautifulSoup(f.read(), "html.parser")
-        template = doc.find("html")
-
-    expander = Expander(template, variables)
+    template = load_template(sys.argv[2])
+    expander = Expander(template, variables, writer=sys.stdout)
+    expander.walk()
+    expander.flush()
+    print()
+
+
+def test_streamed_output_matches_buffered():
+    import io
+    source = '<html><ul z-loop="item:names"><li z-var="item"/></ul></html>'
+    variables = {"names": [f"name {i}" for i in range(50)]}
+    template = BeautifulSoup(source, "html.parser").find("html")
+    buffered = Expander(template, variables)
+    buffered.walk()
+    writer = io.StringIO()
+    streamed = Expander(template, variables, writer=writer, buffer_size=16)
+    streamed.walk()
+    streamed.flush()
+    assert writer.getvalue() == buffered.get_result()
+    assert streamed.result == []
+
+
+def test_env_shadowing_and_restore():
+    env = Env({"x": 1})
+    env.push({"x": 2, "y": 3})
+    assert (env.find("x"), env.find("y")) == (2, 3)
+    env.set("x", 4)
+    assert env.find("x") == 4
+    env.pop()
+    assert (env.find("x"), env.find("y")) == (1, None)
+
+
+NESTED = (
+    '<html><ul z-loop="item:outer"><li z-loop="item:inner"><b z-var="item"/></li>'
+    '<i z-var="item"/></ul><p z-var="item"/></html>'
+)
+NESTED_VARS = {"outer": ["a", "b"], "inner": ["1", "2"]}
+NESTED_RESULT = (
+    "<html><ul><li><b>1</b><b>2</b></li><i>a</i>"
+    "<li><b>1</b><b>2</b></li><i>b</i></ul><p>UNDEF</p></html>"
+)
+
+
+def test_nested_loops_with_same_index_name():
+    template = BeautifulSoup(NESTED, "html.parser").find("html")
+    expander = Expander(template, NESTED_VARS)
     expander.walk()
-    print(expander.get_result())
+    assert expander.get_result() == NESTED_RESULT
 
 
 if __name__ == '__main__':
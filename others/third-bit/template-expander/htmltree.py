@@ -0,0 +1,136 @@
+"""Build a compact template tree with the standard library's HTMLParser
+instead of BeautifulSoup. Nodes expose the same .name, .attrs, .children
+and .string that the expander and compiler use."""
+
+from html.parser import HTMLParser
+
+VOID = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+
+PRESERVE_WHITESPACE = {"pre", "textarea"}
+ASCII_SPACES = " \n\t\x0c\r"
+
+
+class Element:
+    __slots__ = ("name", "attrs", "children")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.children = []
+
+    def find(self, name):
+        """Return the first element called name, depth first, or None"""
+        for child in self.children:
+            if isinstance(child, Element):
+                if child.name == name:
+                    return child
+                if (found := child.find(name)) is not None:
+                    return found
+        return None
+
+
+class Text(str):
+    __slots__ = ()
+
+    @property
+    def string(self):
+        return str(self)
+
+
+class TreeBuilder(HTMLParser):
+    """Nest elements the way BeautifulSoup's html.parser builder does:
+    void and self-closing tags have no children, an end tag closes back
+    to its matching start tag, and whitespace-only text becomes a single
+    newline if it contains one and a single space if not"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Element(None, {})
+        self.stack = [self.root]
+        self.pending = []
+
+    def handle_starttag(self, tag, attrs):
+        node = self._add(tag, attrs)
+        if tag not in VOID:
+            self.stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        self._add(tag, attrs)
+
+    def handle_endtag(self, tag):
+        self._flush()
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].name == tag:
+                del self.stack[i:]
+                return
+
+    def handle_data(self, data):
+        self.pending.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    def _add(self, tag, attrs):
+        self._flush()
+        node = Element(tag, {
+            name: "" if value is None else value for name, value in attrs
+        })
+        self.stack[-1].children.append(node)
+        return node
+
+    def _flush(self):
+        if not self.pending:
+            return
+        text = "".join(self.pending)
+        self.pending = []
+        if not text.strip(ASCII_SPACES) and not any(
+            node.name in PRESERVE_WHITESPACE for node in self.stack
+        ):
+            text = "\n" if "\n" in text else " "
+        self.stack[-1].children.append(Text(text))
+
+
+def parse(text):
+    builder = TreeBuilder()
+    builder.feed(text)
+    builder.close()
+    return builder.root
+
+
+def load_template(path):
+    with open(path) as f:
+        return parse(f.read()).find("html")
+
+
+def shape(node):
+    """Element names and text as nested lists, for comparing trees"""
+    if isinstance(node, Text):
+        return str(node)
+    return [node.name, *[shape(child) for child in node.children]]
+
+
+def test_void_and_self_closing_tags_have_no_children():
+    tree = parse('<html><p>a<br>b<span z-var="x"/>c<img src="i"></p></html>')
+    assert shape(tree.find("p")) == ["p", "a", ["br"], "b", ["span"], "c", ["img"]]
+    assert tree.find("span").attrs == {"z-var": "x"}
+
+
+def test_end_tag_closes_back_to_its_match():
+    tree = parse("<html><div><p>x<em>y</div>z</html>")
+    assert shape(tree.find("html")) == ["html", ["div", ["p", "x", ["em", "y"]]], "z"]
+
+
+def test_stray_end_tag_is_ignored():
+    tree = parse("<html><p>x</span>y</p></html>")
+    assert shape(tree.find("html")) == ["html", ["p", "x", "y"]]
+
+
+def test_whitespace_collapses_like_beautifulsoup():
+    tree = parse("<html><b>a</b>  <i>b</i>\n  <pre>  </pre></html>")
+    assert shape(tree.find("html")) == [
+        "html", ["b", "a"], " ", ["i", "b"], "\n", ["pre", "  "]
+    ]
@@ -9,4 +9,10 @@ def close(expander, node):
     flag = expander.env.find(node.attrs["z-if"])
     if flag:
         expander.show_tag(node, closing=True)
-    
+
+
+def compile(compiler, node):
+    with compiler.when(node.attrs["z-if"]):
+        compiler.tag(node)
+        compiler.children(node)
+        compiler.tag(node, closing=True)
@@ -11,4 +11,11 @@ def open(expander, node):
 
 def close(expander, node):
     expander.show_tag(node, closing=True)
-        
+
+
+def compile(compiler, node):
+    index_name, target = node.attrs["z-loop"].split(":")
+    compiler.tag(node)
+    with compiler.loop(index_name, target):
+        compiler.children(node)
+    compiler.tag(node, closing=True)
@@ -5,3 +5,9 @@ def open(expander, node):
 
 def close(expander, node):
     expander.show_tag(node, closing=True)
+
+
+def compile(compiler, node):
+    compiler.tag(node)
+    compiler.var(node.attrs["z-var"])
+    compiler.tag(node, closing=True)